@@ -0,0 +1,97 @@
+"""Measures the memory used by many small Pmfs in each representation.
+
+Usage: python bench_pmf_memory.py [number of Pmfs] [values per Pmf]
+
+Sizes come from sys.getsizeof applied recursively, counting shared
+objects once, so the numbers are deterministic and comparable.
+"""
+
+import sys
+
+import numpy as np
+import pmf
+
+
+class BaselinePmf(object):
+    """The layout Pmf had before it used __slots__: an instance
+    __dict__ holding d and name, as the old _DictWrapper set them.
+
+    Only the attributes matter for memory, so the methods are left out.
+    """
+
+    def __init__(self, d=None, name=''):
+        if d == None:
+            d = {}
+        self.d = d
+        self.name = name
+
+
+def deep_size(obj, seen=None):
+    """Returns the size in bytes of obj and everything it references.
+
+    Args:
+        obj: any object
+        seen: set of ids already counted
+
+    Returns:
+        int number of bytes
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, np.ndarray):
+        if obj.base is not None:
+            size += deep_size(obj.base, seen)
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.iteritems():
+            size += deep_size(key, seen) + deep_size(value, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += deep_size(item, seen)
+
+    if hasattr(obj, '__dict__'):
+        size += deep_size(obj.__dict__, seen)
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, '__slots__', ()):
+            if hasattr(obj, slot):
+                size += deep_size(getattr(obj, slot), seen)
+    return size
+
+
+def make_dicts(n, k, rng):
+    """Makes n random dicts that map k float values to probabilities."""
+    dicts = []
+    for _ in xrange(n):
+        ps = rng.random_sample(k)
+        ps /= ps.sum()
+        dicts.append(dict(zip(rng.random_sample(k).tolist(), ps.tolist())))
+    return dicts
+
+
+def main(n=100000, k=4):
+    rng = np.random.RandomState(17)
+    dicts = make_dicts(n, k, rng)
+    payload = deep_size(dicts)
+
+    reps = [
+        ('Pmf, baseline', [BaselinePmf(dict(d)) for d in dicts]),
+        ('Pmf', [pmf.Pmf(dict(d)) for d in dicts]),
+        ('ArrayPmf', [pmf.Pmf(d).to_array_pmf() for d in dicts]),
+        ('PackedPmfs', pmf.PackedPmfs.from_pmfs([pmf.Pmf(d) for d in dicts])),
+    ]
+
+    print '%d Pmfs with %d values each' % (n, k)
+    print 'plain dicts: %.1f bytes per Pmf' % (payload / float(n))
+    print '%-16s %12s %14s' % ('representation', 'bytes/Pmf', 'vs plain dicts')
+    for label, obj in reps:
+        per = deep_size(obj) / float(n)
+        print '%-16s %12.1f %14.1f' % (label, per, per - payload / float(n))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,223 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+"""Fixed-memory histograms for continuous data.
+
+BinnedHist: counts values in a fixed set of bins.
+
+linear_edges, log_edges, hdr_edges: bin layouts for BinnedHist.
+
+"""
+
+import math
+
+import numpy as np
+import pmf
+
+
+def linear_edges(low, high, n):
+    """Makes n bins of equal width between low and high.
+
+    Args:
+        low: lower edge of the first bin
+        high: upper edge of the last bin
+        n: int number of bins
+
+    Returns:
+        numpy array of n+1 edges
+    """
+    return np.linspace(low, high, n+1)
+
+
+def log_edges(low, high, n):
+    """Makes n bins of equal width in log space between low and high.
+
+    Args:
+        low: positive lower edge of the first bin
+        high: upper edge of the last bin
+        n: int number of bins
+
+    Returns:
+        numpy array of n+1 edges
+    """
+    if low <= 0:
+        raise ValueError('low must be positive for logarithmic bins.')
+    return np.logspace(math.log10(low), math.log10(high), n+1)
+
+
+def hdr_edges(lowest, highest, significant_digits=2):
+    """Makes bins with bounded relative width, like HdrHistogram.
+
+    Each power-of-two range [2**k, 2**(k+1)) is split into the same
+    number of equal sub-bins, enough that every bin is narrower than
+    10**-significant_digits of its lower edge.  The bins start at the
+    last edge at or below lowest, after a first bin from 0 that
+    catches the smallest values.
+
+    Args:
+        lowest: positive smallest value to resolve
+        highest: largest value to count
+        significant_digits: int number of decimal digits to keep
+
+    Returns:
+        numpy array of edges
+    """
+    if lowest <= 0:
+        raise ValueError('lowest must be positive for HDR bins.')
+    sub_bins = 2 ** int(math.ceil(math.log(10 ** significant_digits, 2)))
+    first = int(math.floor(math.log(lowest, 2)))
+    last = int(math.ceil(math.log(highest, 2)))
+    edges = [np.linspace(2.0 ** k, 2.0 ** (k+1), sub_bins+1)[:-1]
+             for k in range(first, last)]
+    edges = np.concatenate(edges + [[2.0 ** last]])
+    start = np.searchsorted(edges, lowest, side='right') - 1
+    return np.concatenate(([0.0], edges[start:]))
+
+
+class BinnedHist(object):
+    """Represents a histogram of continuous values over fixed bins.
+
+    Memory is fixed by the number of bins, no matter how many values
+    are added.  Bin i holds the values in [edges[i], edges[i+1]); the
+    last bin also holds edges[-1].  Values outside the edges are
+    counted in underflow and overflow; NaNs are ignored.
+
+    Attributes:
+        edges: sorted numpy array of bin edges
+        counts: numpy array of counts, one per bin
+        underflow: count of values below edges[0]
+        overflow: count of values above edges[-1]
+        name: string name
+    """
+
+    def __init__(self, edges, name=''):
+        self.edges = np.asarray(edges, dtype=float)
+        if len(self.edges) < 2 or np.any(np.diff(self.edges) <= 0):
+            raise ValueError('edges must be increasing, with at least two.')
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+        self.name = name
+
+    def __len__(self):
+        return len(self.counts)
+
+    def copy(self, name=None):
+        """Returns a copy of this BinnedHist.
+
+        Args:
+            name: string name for the new BinnedHist
+        """
+        if name is None:
+            name = self.name
+        new = BinnedHist(self.edges, name)
+        new.update(self)
+        return new
+
+    def add(self, values, weights=None):
+        """Counts an array of values.
+
+        Args:
+            values: number or array of numbers
+            weights: optional int array of counts, parallel to values
+        """
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        if weights is None:
+            weights = np.ones(len(values), dtype=np.int64)
+        weights = np.atleast_1d(np.asarray(weights, dtype=np.int64))
+        keep = ~np.isnan(values)
+        values, weights = values[keep], weights[keep]
+
+        n = len(self.counts)
+        i = np.searchsorted(self.edges, values, side='right') - 1
+        i[values == self.edges[-1]] = n - 1
+        # shift by one so that underflow lands in slot 0
+        slots = np.bincount(np.clip(i, -1, n) + 1, weights=weights,
+                            minlength=n+2).astype(np.int64)
+        self.underflow += int(slots[0])
+        self.counts += slots[1:-1]
+        self.overflow += int(slots[-1])
+
+    def update(self, other):
+        """Adds the counts of another BinnedHist with the same edges."""
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError('histograms must have the same edges.')
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+    def __add__(self, other):
+        hist = self.copy()
+        hist.update(other)
+        return hist
+
+    def __iadd__(self, other):
+        self.update(other)
+        return self
+
+    def total(self):
+        """Returns the number of values counted, including those
+        outside the edges."""
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+    def midpoints(self):
+        """Returns the array of bin midpoints."""
+        return (self.edges[:-1] + self.edges[1:]) / 2.0
+
+    def render(self):
+        """Generates a sequence of points suitable for plotting.
+
+        Returns:
+            tuple of (bin midpoints, counts)
+        """
+        return self.midpoints(), self.counts
+
+    def mean(self):
+        """Estimates the mean of the values inside the edges from the
+        bin midpoints; nan if there are none."""
+        n = self.counts.sum()
+        if n == 0:
+            return float('nan')
+        return float(np.dot(self.midpoints(), self.counts)) / n
+
+    def to_pmf(self, name=None):
+        """Makes a Pmf that puts each bin's share at its midpoint.
+
+        Values outside the edges are left out.
+
+        Args:
+            name: string name for the new Pmf
+
+        Returns:
+            normalized pmf.ArrayPmf; empty if no values are inside
+        """
+        if name is None:
+            name = self.name
+        keep = self.counts > 0
+        new = pmf.ArrayPmf(self.midpoints()[keep], self.counts[keep], name)
+        if len(new):
+            new.normalize()
+        return new
+
+    def to_cdf(self, name=None):
+        """Makes a Cdf with one step at the upper edge of each
+        non-empty bin.
+
+        Values outside the edges are left out, so percentiles are of
+        the values inside them; each is off by at most the width of
+        the bin it falls in.
+
+        Args:
+            name: string name for the new Cdf
+
+        Returns:
+            cdf.Cdf; empty if no values are inside
+        """
+        if name is None:
+            name = self.name
+        keep = self.counts > 0
+        return pmf._cdf_from_arrays(self.edges[1:][keep], self.counts[keep],
+                                    name)
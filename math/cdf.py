@@ -7,27 +7,58 @@ Distributed under the GNU General Public License at gnu.org/licenses/gpl.html.
 
 """Functions for building CDFs (cumulative distribution functions)."""
 
-import bisect
 import math
 import random
+
+import numpy as np
 import pmf
+import serialize
+
+
+def _ends_of_runs(keys):
+    """Marks the first and last element of each run of equal keys.
+
+    Args:
+        keys: numpy array
+
+    Returns:
+        boolean numpy array
+    """
+    keep = np.ones(len(keys), dtype=bool)
+    if len(keys) == 0:
+        return keep
+    keep[1:] = keys[1:] != keys[:-1]
+    keep[:-1] |= keys[:-1] != keys[1:]
+    keep[-1] = True
+    return keep
+
+
+def _scalar(a):
+    """Converts a numpy scalar to the equivalent Python object."""
+    if isinstance(a, np.generic):
+        return a.item()
+    return a
 
 
 class Cdf(object):
     """Represents a cumulative distribution function.
 
+    The values and probabilities are stored as numpy arrays, so prob,
+    value and percentile answer an array of queries with one
+    searchsorted call.
+
     Attributes:
-        xs: sequence of values
-        ps: sequence of probabilities
+        xs: sorted numpy array of values
+        ps: numpy array of cumulative probabilities, parallel to xs
         name: string used as a graph label.
     """
     def __init__(self, xs=None, ps=None, name=''):
-        self.xs = [] if xs is None else xs
-        self.ps = [] if ps is None else ps
+        self.xs = pmf._values_array([] if xs is None else xs)
+        self.ps = np.asarray([] if ps is None else ps, dtype=float)
         self.name = name
 
     def values(self):
-        """Returns a sorted list of values.
+        """Returns a sorted array of values.
         """
         return self.xs
 
@@ -36,74 +67,115 @@ class Cdf(object):
 
         Note: in Python3, returns an iterator.
         """
-        return zip(self.xs, self.ps)
+        return zip(self.xs.tolist(), self.ps.tolist())
 
     def append(self, x, p):
         """Add an (x, p) pair to the end of this CDF.
 
         Note: this us normally used to build a CDF from scratch, not
         to modify existing CDFs.  It is up to the caller to make sure
-        that the result is a legal CDF.
+        that the result is a legal CDF.  Each call copies the arrays;
+        to build a large CDF, pass lists or arrays to the constructor.
         """
-        self.xs.append(x)
-        self.ps.append(p)
+        self.xs = pmf._values_array(self.xs.tolist() + [x])
+        self.ps = np.append(self.ps, p)
 
     def prob(self, x):
         """Returns CDF(x), the probability that corresponds to value x.
 
         Args:
-            x: number
+            x: number or array of numbers
 
         Returns:
-            float probability
+            float probability, or array of probabilities parallel to x
         """
-        if x < self.xs[0]: return 0.0
-        index = bisect.bisect(self.xs, x)
-        p = self.ps[index-1]
-        return p
+        if self.xs.dtype.hasobject and not isinstance(x, np.ndarray):
+            # a tuple is one value here, not an array of queries
+            x, q = np.empty((), dtype=object), x
+            x[()] = q
+        i = np.searchsorted(self.xs, x, side='right')
+        ps = np.where(i > 0, self.ps[np.maximum(i-1, 0)], 0.0)
+        if np.ndim(ps) == 0:
+            return float(ps)
+        return ps
 
     def value(self, p):
         """Returns InverseCDF(p), the value that corresponds to probability p.
 
+        This is the smallest value whose cumulative probability is at
+        least p.
+
         Args:
-            p: number in the range [0, 1]
+            p: number or array of numbers in the range [0, 1]
 
         Returns:
-            number value
+            number value, or array of values parallel to p
         """
-        if p < 0 or p > 1:
+        p = np.asarray(p, dtype=float)
+        if np.any((p < 0) | (p > 1)):
             raise ValueError('Probability p must be in range [0, 1]')
 
-        if p == 0: return self.xs[0]
-        if p == 1: return self.xs[-1]
-        index = bisect.bisect(self.ps, p)
-        if p == self.ps[index-1]:
-            return self.xs[index-1]
-        else:
-            return self.xs[index]
+        n = len(self.ps)
+        i = np.searchsorted(self.ps, p, side='right')
+        prev = np.maximum(i-1, 0)
+        i = np.where((i > 0) & (self.ps[prev] == p), prev, np.minimum(i, n-1))
+        i = np.where(p == 0, 0, np.where(p == 1, n-1, i))
+        if np.ndim(i) == 0:
+            return _scalar(self.xs[int(i)])
+        return self.xs[i]
 
     def percentile(self, p):
         """Returns the value that corresponds to percentile p.
 
         Args:
-            p: number in the range [0, 100]
+            p: number or array of numbers in the range [0, 100]
 
         Returns:
-            number value
+            number value, or array of values parallel to p
         """
-        return self.value(p / 100.0)
+        return self.value(np.asarray(p, dtype=float) / 100.0)
 
     def random(self):
         """Chooses a random value from this distribution."""
         return self.value(random.random())
     
-    def sample(self, n):
+    def sample(self, n, rng=None):
         """Generates a random sample from this distribution.
-        
+
+        Draws n uniforms and maps them through the inverse CDF with
+        one searchsorted call.
+
+        Args:
+            n: int length of the sample
+            rng: numpy RandomState or int seed; if omitted, uses the
+                 global numpy generator
+
+        Returns:
+            numpy array of values
+        """
+        if len(self.ps) == 0:
+            raise ValueError('Cdf contains no values.')
+        rng = pmf.random_state(rng)
+        # scaling by the last probability keeps every draw in range
+        # when the ps do not quite reach 1
+        us = rng.random_sample(n) * self.ps[-1]
+        return self.xs[np.searchsorted(self.ps, us)]
+
+    def sample_chunks(self, n, chunksize=1000000, rng=None):
+        """Generates a large random sample in arrays of bounded size.
+
         Args:
             n: int length of the sample
+            chunksize: int maximum length of each array
+            rng: numpy RandomState or int seed; if omitted, uses the
+                 global numpy generator
+
+        Returns:
+            iterator of numpy arrays
         """
-        return [self.random() for i in range(n)]
+        rng = pmf.random_state(rng)
+        for start in xrange(0, n, chunksize):
+            yield self.sample(min(chunksize, n - start), rng)
 
     def mean(self):
         """Computes the mean of a CDF.
@@ -111,13 +183,16 @@ class Cdf(object):
         Returns:
             float mean
         """
-        old_p = 0
-        total = 0.0
-        for x, new_p in zip(self.xs, self.ps):
-            p = new_p - old_p
-            total += p * x
-            old_p = new_p
-        return total
+        return float(np.dot(self.xs, np.diff(np.concatenate(([0.0], self.ps)))))
+
+    def save(self, path):
+        """Saves this CDF to a binary file; see serialize.py.
+
+        Args:
+            path: string filename
+        """
+        serialize.write_arrays(path, 'Cdf', self.name,
+                               [('xs', self.xs), ('ps', self.ps)])
 
     def _round(self, multiplier=1000.0):
         """
@@ -125,57 +200,116 @@ class Cdf(object):
         from the previous value in a significant digit, where the number
         of significant digits is determined by multiplier.  The
         default is 1000, which keeps log10(1000) = 3 significant digits.
+
+        The last entry with each leading digits is kept too, so the
+        curve still reaches every probability it passes through.  The
+        cdf is modified in place; see compress for the error bounds.
         """
-        # TODO(write this method)
-        pass
+        keep = _ends_of_runs(np.floor(self.ps * multiplier))
+        self.xs = self.xs[keep]
+        self.ps = self.ps[keep]
+
+    def compress(self, multiplier=None, max_points=None):
+        """Makes a smaller copy of this CDF that keeps its shape.
+
+        Applies _round, which keeps the first and the last entry whose
+        probability has each value of floor(p * multiplier), so at
+        most 2 * (multiplier + 1) entries remain.  For the compressed
+        copy:
+
+            prob(x) is below the exact CDF(x) by less than 1/multiplier
+            and never above it;
+
+            value(p) and percentile(100*p) return one of the original
+            values, at or above the exact one, with less than
+            1/multiplier of the probability between them, so a
+            percentile is off by less than 100/multiplier in rank.
+
+        Args:
+            multiplier: number of probability levels to resolve; the
+                        default is 1000
+            max_points: int bound on the number of entries, at least 4;
+                        chooses the multiplier instead
 
-    def render(self):
+        Returns:
+            new Cdf
+        """
+        if multiplier is not None and max_points is not None:
+            raise ValueError('give either multiplier or max_points, '
+                             'not both.')
+        if max_points is not None:
+            if max_points < 4:
+                raise ValueError('max_points must be at least 4.')
+            multiplier = max_points // 2 - 1
+        elif multiplier is None:
+            multiplier = 1000.0
+
+        new = Cdf(self.xs, self.ps, self.name)
+        if max_points is None or len(self.ps) > max_points:
+            new._round(multiplier)
+        return new
+
+    def render(self, resolution=None, xscale='linear'):
         """Generates a sequence of points suitable for plotting.
 
         An empirical CDF is a step function; linear interpolation
         can be misleading.
 
+        With a resolution, the x range is split into that many equal
+        columns, e.g. one per pixel, and only the first and last value
+        in each column are drawn.  The CDF rises monotonically within
+        a column, so the thinned curve covers the same pixels, and
+        isolated steps in the tails are all kept.
+
+        Args:
+            resolution: int number of columns to thin to; if omitted,
+                        every step is drawn
+            xscale: 'linear', or 'log' for columns of equal width on a
+                    log axis; values must then be positive
+
         Returns:
-            tuple of (xs, ps)
+            tuple of (xs, ps) numpy arrays
         """
-        xs = [self.xs[0]]
-        ps = [0.0]
-        for i, p in enumerate(self.ps):
-            xs.append(self.xs[i])
-            ps.append(p)
-
-            try:
-                xs.append(self.xs[i+1])
-                ps.append(p)
-            except IndexError:
-                pass
-        return xs, ps
+        xs, ps = self.xs, self.ps
+        if resolution is not None and len(xs) > 2 * resolution:
+            if xscale == 'log':
+                xs = np.log(xs)
+            elif xscale != 'linear':
+                raise ValueError('xscale must be linear or log.')
+            scale = float(resolution) / (xs[-1] - xs[0])
+            cols = np.floor((xs - xs[0]) * scale)
+            keep = _ends_of_runs(cols)
+            xs, ps = self.xs[keep], ps[keep]
+
+        # each value appears twice: at the top of the riser that
+        # reaches it and at the end of the tread that leads to it
+        rxs = np.repeat(xs, 2)
+        rps = np.concatenate(([0.0], np.repeat(ps, 2)))[:len(rxs)]
+        return rxs, rps
 
 
 def cdf_from_items(items, name=''):
     """Makes a cdf from an unsorted sequence of (value, frequency) pairs.
 
+    The pairs are sorted and accumulated with numpy; the frequencies
+    of repeated values are added.  No pairs make an empty Cdf.
+
     Args:
-        items: unsorted sequence of (value, frequency) pairs
+        items: unsorted sequence of (value, frequency) pairs, or a
+               numpy array with one row per pair
         name: string name for this CDF
 
     Returns:
-        cdf: list of (value, fraction) pairs
+        Cdf object
     """
-    runsum = 0
-    xs = []
-    cs = []
-
-    for value, count in sorted(items):
-        runsum += count
-        xs.append(value)
-        cs.append(runsum)
-
-    total = float(runsum)
-    ps = [c/total for c in cs]
-
-    cdf = Cdf(xs, ps, name)
-    return cdf
+    if isinstance(items, np.ndarray) and items.ndim == 2:
+        xs, ws = items[:, 0], items[:, 1]
+    else:
+        items = list(items)
+        xs = pmf._values_array([x for x, _ in items])
+        ws = np.array([w for _, w in items])
+    xs, ws = pmf._aggregate(xs, ws)
+    return pmf._cdf_from_arrays(xs, ws, name)
 
 
 def cdf_from_dict(d, name=''):
@@ -201,7 +335,8 @@ def cdf_from_hist(hist, name=''):
     Returns:
         Cdf object
     """
-    return cdf_from_items(hist.items(), name)
+    shared = hist.make_cdf(name)
+    return Cdf(shared.xs, shared.ps, shared.name)
 
 
 def cdf_from_pmf(a, name=None):
@@ -216,12 +351,17 @@ def cdf_from_pmf(a, name=None):
     """
     if name == None:
         name = a.name
-    return cdf_from_items(a.items(), name)
+    shared = a.make_cdf(name)
+    return Cdf(shared.xs, shared.ps, shared.name)
 
 
 def cdf_from_list(seq, name=''):
     """Creates a CDF from an unsorted sequence.
 
+    Numeric lists and numpy arrays are counted directly with a sort
+    and unique, without building a Hist.  An empty sequence makes an
+    empty Cdf.
+
     Args:
         seq: unsorted sequence of sortable values
         name: string name for the cdf
@@ -229,7 +369,71 @@ def cdf_from_list(seq, name=''):
     Returns:
        Cdf object
     """
-    hist = pmf.hist_from_list(seq)
-    return cdf_from_hist(hist, name)
+    counts = pmf._count_values(seq)
+    if counts is None:
+        hist = pmf.hist_from_list(seq)
+        return cdf_from_hist(hist, name)
+    xs, freqs = counts
+    return pmf._cdf_from_arrays(xs, freqs, name)
+
+
+def cdf_from_weighted(values, weights, name=''):
+    """Makes a CDF from values and their sampling weights.
+
+    Args:
+        values: sequence or numpy array of sortable values
+        weights: sequence or numpy array of weights, parallel to values
+        name: string name for the cdf
+
+    Returns:
+        Cdf object; empty if no weight is positive
+    """
+    xs, ws = pmf._weighted_arrays(values, weights)
+    return pmf._cdf_from_arrays(xs, ws, name)
+
+
+def weighted_percentile(values, weights, p):
+    """Computes percentiles of values weighted by their sampling weights.
 
+    Uses the same rule as Cdf.percentile: the smallest value whose
+    weighted CDF reaches p/100.
 
+    Args:
+        values: sequence or numpy array of sortable values
+        weights: sequence or numpy array of weights, parallel to values
+        p: number or array of numbers in the range [0, 100]
+
+    Returns:
+        value, or numpy array of values parallel to p
+    """
+    p = np.asarray(p, dtype=float)
+    if np.any((p < 0) | (p > 100)):
+        raise ValueError('Percentile p must be in range [0, 100]')
+    xs, ws = pmf._weighted_arrays(values, weights)
+    if len(xs) == 0:
+        raise ValueError('no values with positive weight.')
+    cs = np.cumsum(ws)
+    i = np.searchsorted(cs / cs[-1], p / 100.0)
+    return xs[np.minimum(i, len(xs)-1)]
+
+
+def load_cdf(path, mmap_mode='r'):
+    """Loads a CDF written by Cdf.save.
+
+    With the default mode 'r' the arrays are mapped read-only, so
+    writing to xs or ps in place fails; load with 'c' (copy-on-write)
+    or None to get arrays that can be modified.
+
+    Args:
+        path: string filename
+        mmap_mode: None to read the arrays into memory, or a numpy
+                   memmap mode such as 'r', so that processes loading
+                   the same file share one copy
+
+    Returns:
+        Cdf object whose xs and ps are numpy arrays
+    """
+    kind, name, arrays = serialize.read_arrays(path, mmap_mode)
+    if kind != 'Cdf':
+        raise ValueError('%s does not hold a Cdf.' % path)
+    return Cdf(arrays['xs'], arrays['ps'], name)
@@ -13,24 +13,343 @@ Pmf: represents a probability mass function (map from values to probs).
 
 _DictWrapper: private parent class for Hist and Pmf.
 
+ArrayHist, ArrayPmf: array-backed counterparts of Hist and Pmf.
+
+LogPmf: array-backed Pmf that stores log probabilities.
+
+PackedPmfs: many small Pmfs stored in one shared pair of arrays.
+
+_ArrayWrapper: private parent class for ArrayHist and ArrayPmf.
+
+_HistMethods, _PmfMethods: private mixins with the methods shared by
+both storage kinds.
+
+AliasSampler: draws values from a Pmf in constant time per draw.
+
 """
 
+import bisect
+import itertools
 import logging
 import math
+import multiprocessing
+import numbers
 import random
 
-class _DictWrapper(object):
+import numpy as np
+import serialize
+
+class _Wrapper(object):
+    """
+    Private parent class for _DictWrapper and _ArrayWrapper.
+
+    version counts the mutations made through the mutating methods;
+    derived results such as the total, the moments and the sorted
+    render are cached until it changes.  Code that modifies the
+    underlying dict or arrays directly must call changed() afterwards.
+
+    The containers use __slots__ and create the cache on first use,
+    so large numbers of small instances stay compact.
+    """
+
+    __slots__ = ('version', '_cache', '_cache_version')
+
+    def __init__(self):
+        self.version = 0
+        self._cache = None
+        self._cache_version = 0
+
+    def __getstate__(self):
+        # slotted classes need explicit state to pickle; the cache is
+        # dropped rather than pickled
+        state = {}
+        for cls in type(self).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if slot in ('_cache', '_cache_version'):
+                    continue
+                if hasattr(self, slot):
+                    state[slot] = getattr(self, slot)
+        state.update(getattr(self, '__dict__', {}))
+        return state
+
+    def __setstate__(self, state):
+        _Wrapper.__init__(self)
+        for key, value in state.iteritems():
+            setattr(self, key, value)
+
+    def changed(self):
+        """Records a mutation, invalidating the cached results."""
+        self.version += 1
+
+    def _cached(self, key, func):
+        """Returns func(), memoized until the next mutation.
+
+        Args:
+            key: hashable cache key
+            func: callable with no arguments
+        """
+        if self._cache is None or self._cache_version != self.version:
+            self._cache = {}
+            self._cache_version = self.version
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = func()
+            return value
+
+    def _stored_arrays(self):
+        """Gets the (values, weights) arrays that save writes."""
+        return self.to_arrays()
+
+    def save(self, path):
+        """Saves this distribution to a binary file; see serialize.py.
+
+        Values must be numbers or strings, not other Python objects.
+
+        Args:
+            path: string filename
+        """
+        for cls in type(self).__mro__:
+            if cls.__name__ in _LOADERS:
+                break
+        xs, ws = self._stored_arrays()
+        serialize.write_arrays(path, cls.__name__, self.name,
+                               [('xs', xs), ('ws', ws)])
+
+    def cumulative(self):
+        """Gets the prefix-sum index of this distribution.
+
+        The index is cached until the next mutation.
+
+        Returns:
+            tuple of (sorted values array, cumulative totals array),
+            where the totals array has a leading zero, so the total
+            of the first i values is totals[i]
+        """
+        def build():
+            xs, ws = self.to_arrays()
+            return xs, np.concatenate(([0], np.cumsum(ws)))
+        return self._cached('cumulative', build)
+
+    def prob_range(self, low, high, closed='both'):
+        """Computes the total freq/prob of the values in an interval.
+
+        Each query costs two binary searches in the prefix-sum index.
+        low and high may be arrays, in which case one total is
+        computed per pair of bounds.
+
+        Args:
+            low: lower bound, number or array
+            high: upper bound, number or array
+            closed: which bounds are included: 'both', 'left',
+                    'right' or 'neither'
+
+        Returns:
+            float total, or array of totals
+        """
+        if closed not in ('both', 'left', 'right', 'neither'):
+            raise ValueError('closed must be both, left, right or neither.')
+        xs, cs = self.cumulative()
+        left_side = 'left' if closed in ('both', 'left') else 'right'
+        right_side = 'right' if closed in ('both', 'right') else 'left'
+        i = np.searchsorted(xs, low, side=left_side)
+        j = np.searchsorted(xs, high, side=right_side)
+        totals = cs[j] - cs[np.minimum(i, j)]
+        if np.ndim(totals) == 0:
+            return totals.item()
+        return totals
+
+
+class _HistMethods(object):
+    """
+    Private mixin with the methods that Hist and ArrayHist share.
+
+    They are written against to_arrays and copy/update, so they work
+    for either storage kind.
+    """
+
+    __slots__ = ()
+
+    def is_subset(self, other):
+        """Checks whether the values in this histogram are a subset of
+        the values in the given histogram."""
+        xs1, ws1 = self.to_arrays()
+        xs2, ws2 = other.to_arrays()
+        return bool(np.all(ws1 <= _lookup(xs2, ws2, xs1)))
+
+    def union(self, other, name=None):
+        """Computes the multiset union: the larger frequency of each value.
+
+        Args:
+            other: Hist or ArrayHist
+            name: string name for the new histogram
+
+        Returns:
+            new histogram of the same storage kind as this one
+        """
+        return _multiset_op(self, other, np.maximum, name)
+
+    def intersection(self, other, name=None):
+        """Computes the multiset intersection: the smaller frequency of
+        each value.
+
+        Args:
+            other: Hist or ArrayHist
+            name: string name for the new histogram
+
+        Returns:
+            new histogram of the same storage kind as this one
+        """
+        return _multiset_op(self, other, np.minimum, name)
+
+    def difference(self, other, name=None):
+        """Computes the multiset difference: the frequencies of this
+        histogram minus those of other, keeping the positive ones.
+
+        Args:
+            other: Hist or ArrayHist
+            name: string name for the new histogram
+
+        Returns:
+            new histogram of the same storage kind as this one
+        """
+        return _multiset_op(self, other, np.subtract, name)
+
+    def __add__(self, other):
+        hist = self.copy()
+        hist.update(other)
+        return hist
+
+    def __iadd__(self, other):
+        self.update(other)
+        return self
+
+    def expand(self):
+        """Lazily iterates the values, each repeated by its frequency."""
+        return itertools.chain.from_iterable(
+            itertools.repeat(key, value) for key, value in self.iteritems())
+
+    def expand_chunks(self, chunksize=1000000):
+        """Expands the histogram into numpy arrays of bounded size.
+
+        Args:
+            chunksize: int maximum length of each array
+
+        Returns:
+            iterator of numpy arrays, in value order
+        """
+        xs, ws = self.to_arrays()
+        return _expand_chunks(xs, ws, chunksize)
+
+    def expand_array(self):
+        """Expands the histogram into a sorted numpy array."""
+        xs, ws = self.to_arrays()
+        return np.repeat(xs, np.maximum(ws, 0))
+
+
+class _PmfMethods(object):
+    """
+    Private mixin with the methods that Pmf, ArrayPmf and LogPmf share.
+
+    Each class provides make_sampler; sums and differences go through
+    to_arrays.
+    """
+
+    __slots__ = ()
+
+    def sampler(self):
+        """Gets an AliasSampler for this Pmf, cached until the next
+        mutation."""
+        return self._cached('sampler', self.make_sampler)
+
+    def sample(self, n, rng=None):
+        """Draws a random sample from this PMF.
+
+        Args:
+            n: int length of the sample
+            rng: numpy RandomState or int seed; if omitted, uses the
+                 global numpy generator
+
+        Returns:
+            numpy array of values
+        """
+        return self.sampler().sample(n, rng)
+
+    def __add__(self, other):
+        """Computes the Pmf of the sum of values drawn from self and other.
+
+        Args:
+            other: Pmf or ArrayPmf, or a number to shift the values by
+        """
+        if isinstance(other, numbers.Number):
+            xs, ps = self.to_arrays()
+            return _pmf_like(self, _widen(xs) + other, ps, self.name)
+        return add_pmfs(self, other)
+
+    def __sub__(self, other):
+        """Computes the Pmf of the difference of values drawn from self
+        and other.
+
+        Args:
+            other: Pmf or ArrayPmf, or a number to shift the values by
+        """
+        if isinstance(other, numbers.Number):
+            return self + (-other)
+        return subtract_pmfs(self, other)
+
+
+class _DictWrapper(_Wrapper):
     """
     An object that contains a dictionary.
     An discrete events container.
+
+    With keep_sorted, the values are also kept in a sorted list as
+    they are inserted, so render, to_arrays and make_cdf read them in
+    order instead of sorting, and items/iteritems come out sorted.
+    Adding a new value then costs a binary search and a list insert;
+    add values through set, incr, update or merge rather than by
+    writing to d.
     """
 
-    def __init__(self, d=None, name=''):
+    __slots__ = ('d', 'name', '_keys')
+
+    def __init__(self, d=None, name='', keep_sorted=False):
         # if d is provided, use it; otherwise make a new dict
         if d == None:
             d = {}
         self.d = d
         self.name = name
+        self._keys = sorted(d) if keep_sorted else None
+        _Wrapper.__init__(self)
+
+    def is_sorted(self):
+        """Returns whether the values are kept in sorted order."""
+        return self._keys is not None
+
+    def _copy_keys(self, new):
+        """Gives a copy made by copy() the same sorted values."""
+        if self._keys is not None:
+            new._keys = list(self._keys)
+        return new
+
+    def _add_key(self, x):
+        """Inserts x into the sorted values if it is new."""
+        if self._keys is not None and x not in self.d:
+            bisect.insort(self._keys, x)
+
+    def _add_keys(self, xs):
+        """Inserts the new values from an iterable into the sorted values."""
+        if self._keys is None:
+            return
+        new = sorted(x for x in xs if x not in self.d)
+        if new:
+            # the list is now two sorted runs, which sort merges in
+            # linear time
+            self._keys.extend(new)
+            self._keys.sort()
+
+    def __len__(self):
+        return len(self.d)
 
     def get_dict(self):
         """Gets the dictionary."""
@@ -43,14 +362,29 @@ class _DictWrapper(object):
         dictionaries are the values of the Hist/Pmf, and the
         values are frequencies/probabilities.
         """
+        if self._keys is not None:
+            return list(self._keys)
         return self.d.keys()
 
+    def _weights(self):
+        """Gets the freqs/probs, in the same order as values()."""
+        if self._keys is not None:
+            d = self.d
+            return [d[x] for x in self._keys]
+        return self.d.values()
+
     def items(self):
         """Gets an unsorted sequence of (value, freq/prob) pairs."""
+        if self._keys is not None:
+            d = self.d
+            return [(x, d[x]) for x in self._keys]
         return self.d.items()
 
     def iteritems(self):
         '''docstring for iterate''' 
+        if self._keys is not None:
+            d = self.d
+            return ((x, d[x]) for x in self._keys)
         return self.d.iteritems()
 
     def render(self):
@@ -59,11 +393,18 @@ class _DictWrapper(object):
         Returns:
             tuple of (sorted value sequence, freq/prob sequence)
         """
-        return zip(*sorted(self.items()))
+        if self._keys is not None:
+            return self._cached('render', lambda: zip(*self.items()))
+        return self._cached('render', lambda: zip(*sorted(self.items())))
 
     def __str__(self):
         c = "" 
-        for key, value in sorted(self.d.iteritems(), key = lambda (k,v): (v,k)):
+        if self._keys is not None:
+            # sort is stable, so equal freqs/probs stay in value order
+            items = sorted(self.items(), key=lambda (k, v): v)
+        else:
+            items = sorted(self.d.iteritems(), key=lambda (k, v): (v, k))
+        for key, value in items:
             c = c + "%s: %s\n" % (key, value)
         return c
 
@@ -75,7 +416,9 @@ class _DictWrapper(object):
             x: number value
             y: number freq or prob
         """
+        self._add_key(x)
         self.d[x] = y
+        self.changed()
 
     def incr(self, x, term=1):
         """increments the freq/prob associated with the value x.
@@ -84,7 +427,9 @@ class _DictWrapper(object):
             x: number value
             term: how much to increment by
         """
+        self._add_key(x)
         self.d[x] = self.d.get(x, 0) + term
+        self.changed()
 
     def mult(self, x, factor):
         """Scales the freq/prob associated with the value x.
@@ -93,7 +438,9 @@ class _DictWrapper(object):
             x: number value
             factor: how much to multiply by
         """
+        self._add_key(x)
         self.d[x] = self.d.get(x, 0) * factor
+        self.changed()
 
     def remove(self, x):
         """removes a value.
@@ -104,23 +451,76 @@ class _DictWrapper(object):
             x: value to remove
         """
         del self.d[x]
+        if self._keys is not None:
+            del self._keys[bisect.bisect_left(self._keys, x)]
+        self.changed()
 
     def total(self):
         """Returns the total of the frequencies/probabilities in the map."""
-        total = sum(self.d.itervalues())
-        return total
+        return self._cached('total', lambda: sum(self.d.itervalues()))
 
     def maxlike(self):
         """Returns the largest frequency/probability in the map."""
-        return max(self.d.itervalues())
+        return self._cached('maxlike', lambda: max(self.d.itervalues()))
+
+    def to_arrays(self):
+        """Gets the contents as a pair of numpy arrays.
+
+        The arrays are cached and read-only; copy them to modify.
+
+        Returns:
+            tuple of (sorted values array, freqs/probs array)
+        """
+        def build():
+            xs, ws = self._make_arrays()
+            xs.setflags(write=False)
+            ws.setflags(write=False)
+            return xs, ws
+        return self._cached('arrays', build)
+
+    def _make_arrays(self):
+        """Builds the sorted arrays returned by to_arrays."""
+        keys = self.values()
+        xs = _values_array(keys)
+        if self._keys is not None:
+            d = self.d
+            return xs, np.array([d[x] for x in keys])
+        ws = np.array(self.d.values())
+        order = np.argsort(xs, kind='mergesort')
+        return xs[order], ws[order]
+
+    def make_cdf(self, name=None):
+        """Makes a Cdf of this Hist/Pmf.
+
+        The Cdf is cached until the next mutation and shared by every
+        caller, so its arrays are read-only and it must not be
+        modified; cdf.cdf_from_hist and cdf.cdf_from_pmf return a Cdf
+        of its own.
+
+        Args:
+            name: string name for the Cdf
+
+        Returns:
+            cdf.Cdf object
+        """
+        if name is None:
+            name = self.name
+        def build():
+            xs, ws = self.to_arrays()
+            cdf = _cdf_from_arrays(xs, ws, name)
+            cdf.ps.setflags(write=False)
+            return cdf
+        return self._cached(('cdf', name), build)
 
 
-class Hist(_DictWrapper):
+class Hist(_DictWrapper, _HistMethods):
     """Represents a histogram, which is a map from values to frequencies.
 
     Values can be any hashable type; frequencies are integer counters.
     """
 
+    __slots__ = ()
+
     def copy(self, name=None):
         """Returns a copy of this Hist.
 
@@ -129,7 +529,7 @@ class Hist(_DictWrapper):
         """
         if name is None:
             name = self.name
-        return Hist(dict(self.d), name)
+        return self._copy_keys(Hist(dict(self.d), name))
 
     def freq(self, x):
         """Gets the frequency associated with the value x.
@@ -143,37 +543,55 @@ class Hist(_DictWrapper):
         return self.d.get(x, 0)
 
     def freqs(self):
-        """Gets an unsorted sequence of frequencies."""
-        return self.d.values()
+        """Gets an unsorted sequence of frequencies.
 
-    def is_subset(self, other):
-        """Checks whether the values in this histogram are a subset of
-        the values in the given histogram."""
-        for val, freq in self.items():
-            if freq > other.freq(val):
-                return False
-        return True
+        The order matches values().
+        """
+        return self._weights()
 
     def subtract(self, other):
         """Subtracts the values in the given histogram from this histogram."""
         for val, freq in other.items():
             self.incr(val, -freq)
 
+    def update(self, other):
+        """Adds the frequencies in the given histogram to this histogram."""
+        self._add_keys(x for x, _ in other.iteritems())
+        d = self.d
+        get = d.get
+        for val, freq in other.iteritems():
+            d[val] = get(val, 0) + freq
+        self.changed()
+
     def to_list(self):
-        '''docstring for to_list''' 
+        """Expands the histogram into a list with each value repeated
+        by its frequency."""
         rst = []
         for key, value in self.iteritems():
-            rst.extend(list(key)*value)
+            rst.extend([key] * value)
         return rst
+
+    def to_array_hist(self, name=None):
+        """Returns an array-backed copy of this Hist.
+
+        Args:
+            name: string name for the new ArrayHist
+        """
+        if name is None:
+            name = self.name
+        xs, ws = self.to_arrays()
+        return ArrayHist(xs.copy(), ws.copy(), name)
             
 
-class Pmf(_DictWrapper):
+class Pmf(_DictWrapper, _PmfMethods):
     """Represents a probability mass function.
     
     Values can be any hashable type; probabilities are floating-point.
     Pmfs are not necessarily normalized.
     """
 
+    __slots__ = ()
+
     def copy(self, name=None):
         """Returns a copy of this Pmf.
 
@@ -182,7 +600,7 @@ class Pmf(_DictWrapper):
         """
         if name is None:
             name = self.name
-        return Pmf(dict(self.d), name)
+        return self._copy_keys(Pmf(dict(self.d), name))
 
     def prob(self, x, default=0):
         """Gets the probability associated with the value x.
@@ -197,8 +615,11 @@ class Pmf(_DictWrapper):
         return self.d.get(x, default)
 
     def probs(self):
-        """Gets an unsorted sequence of probabilities."""
-        return self.d.values()
+        """Gets an unsorted sequence of probabilities.
+
+        The order matches values().
+        """
+        return self._weights()
 
     def normalize(self, fraction=1.0):
         """normalizes this PMF so the sum of all probs is 1.
@@ -215,6 +636,7 @@ class Pmf(_DictWrapper):
         factor = float(fraction) / total
         for x in self.d:
             self.d[x] *= factor
+        self.changed()
     
     def random(self):
         """Chooses a random element from this PMF.
@@ -241,6 +663,10 @@ class Pmf(_DictWrapper):
         Returns:
             float mean
         """
+        return self._cached('mean', self._mean)
+
+    def _mean(self):
+        """Computes the mean without the cache."""
         mu = 0.0
         for x, p in self.d.iteritems():
             mu += p * x
@@ -257,8 +683,8 @@ class Pmf(_DictWrapper):
             float variance
         """
         if mu is None:
-            mu = self.mean()
-            
+            return self._cached('variance', lambda: self.variance(self.mean()))
+
         var = 0.0
         for x, p in self.d.iteritems():
             var += p * (x - mu)**2
@@ -276,155 +702,1948 @@ class Pmf(_DictWrapper):
         for x, p in self.d.iteritems():
             self.set(x, math.exp(p-m))
 
+    def merge(self, other, weight=1.0):
+        """Adds the weighted probabilities of another Pmf to this one.
 
-def hist_from_list(t, name=''):
-    """Makes a histogram from an unsorted sequence of values.
+        The result is not normalized; merging weighted components and
+        then calling normalize() yields their mixture.
 
-    Args:
-        t: sequence of numbers
-        name: string name for this histogram
+        Args:
+            other: Pmf or ArrayPmf
+            weight: factor applied to the probabilities of other
+        """
+        self._add_keys(x for x, _ in other.iteritems())
+        d = self.d
+        get = d.get
+        for x, p in other.iteritems():
+            d[x] = get(x, 0) + weight * p
+        self.changed()
 
-    Returns:
-        Hist object
-    """
-    hist = Hist(name=name)
-    [hist.incr(x) for x in t]
-    return hist
+    def make_sampler(self):
+        """Builds an AliasSampler for this Pmf.
 
+        The sampler is a snapshot; rebuild it after changing the Pmf.
+        """
+        xs, ps = self.to_arrays()
+        return AliasSampler(xs, ps)
 
-def hist_from_dict(d, name=''):
-    """Makes a histogram from a map from values to frequencies.
+    def to_array_pmf(self, name=None):
+        """Returns an array-backed copy of this Pmf.
+
+        Args:
+            name: string name for the new ArrayPmf
+        """
+        if name is None:
+            name = self.name
+        xs, ws = self.to_arrays()
+        return ArrayPmf(xs.copy(), ws.copy(), name)
+
+    def to_log_pmf(self, name=None):
+        """Returns a log-space copy of this Pmf.
+
+        Args:
+            name: string name for the new LogPmf
+        """
+        if name is None:
+            name = self.name
+        xs, ws = self.to_arrays()
+        return LogPmf.from_probs(xs, ws, name)
+
+
+def _values_array(xs):
+    """Converts a sequence of values to a 1-D numpy array.
+
+    Values that numpy would coerce to one type, such as tuples split
+    into columns or numbers mixed with strings turned into strings,
+    are kept whole in an object array instead.
 
     Args:
-        d: dictionary that maps values to frequencies
-        name: string name for this histogram
+        xs: numpy array, or sequence of values
 
     Returns:
-        Hist object
+        numpy array
     """
-    return Hist(d, name)
+    if isinstance(xs, np.ndarray) and xs.ndim == 1:
+        return xs
+    a = np.asarray(xs)
+    if a.ndim != 1 or (a.dtype.kind in 'SU' and
+                       not all(isinstance(x, basestring) for x in xs)):
+        a = np.empty(len(xs), dtype=object)
+        for i, x in enumerate(xs):
+            a[i] = x
+    return a
 
 
-def pmf_from_list(t, name=''):
-    """Makes a PMF from an unsorted sequence of values.
+def _mixed_kinds(arrays):
+    """Checks whether value arrays hold values that numpy cannot
+    combine without changing them, such as numbers and strings."""
+    kinds = set(xs.dtype.kind for xs in arrays if len(xs))
+    return not (kinds <= set('biuf') or kinds <= set('SU'))
+
+
+def _expand_chunks(xs, ws, chunksize):
+    """Repeats sorted values by their counts, chunksize at a time.
 
     Args:
-        t: sequence of numbers
-        name: string name for this PMF
+        xs: numpy array of values
+        ws: numpy array of integer counts; counts below 1 are skipped
+        chunksize: int maximum length of each chunk
 
     Returns:
-        Pmf object
+        iterator of numpy arrays
     """
-    hist = hist_from_list(t, name)
-    return pmf_from_hist(hist)
-
-
-def pmf_from_dict(d, name=''):
-    """Makes a PMF from a map from values to probabilities.
+    keep = ws > 0
+    xs, ws = xs[keep], ws[keep]
+    ends = np.cumsum(ws)
+    starts = ends - ws
+    total = int(ends[-1]) if len(ends) else 0
+    for start in xrange(0, total, chunksize):
+        stop = min(start + chunksize, total)
+        i = np.searchsorted(ends, start, side='right')
+        j = np.searchsorted(starts, stop, side='left')
+        counts = (np.minimum(ends[i:j], stop) -
+                  np.maximum(starts[i:j], start))
+        yield np.repeat(xs[i:j], counts)
+
+
+def _aggregate(xs, ws, combine=np.add):
+    """Sorts values and combines the weights of repeated values.
 
     Args:
-        d: dictionary that maps values to probabilities
-        name: string name for this PMF
+        xs: numpy array of values
+        ws: numpy array of weights, parallel to xs
+        combine: binary numpy ufunc that combines two weights
 
     Returns:
-        Pmf object
+        tuple of (sorted unique values, combined weights)
     """
-    pmf = Pmf(d, name)
-    pmf.normalize()
-    return pmf
+    if len(xs) < 2 or np.all(xs[1:] > xs[:-1]):
+        return xs, ws
+    order = np.argsort(xs, kind='mergesort')
+    xs = xs[order]
+    ws = ws[order]
+    starts = np.flatnonzero(np.concatenate(([True], xs[1:] != xs[:-1])))
+    return xs[starts], combine.reduceat(ws, starts)
 
 
-def pmf_from_hist(hist, name=None):
-    """Makes a normalized PMF from a Hist object.
+def _unshared(a, arg):
+    """Copies a if it shares memory with the caller's argument arg."""
+    if isinstance(arg, np.ndarray) and np.may_share_memory(a, arg):
+        return a.copy()
+    return a
+
+
+def _lookup(xs, ws, keys, default=0):
+    """Gets the weights of an array of values from sorted arrays.
 
     Args:
-        hist: Hist object
-        name: string name
+        xs: sorted numpy array of values
+        ws: numpy array of weights, parallel to xs
+        keys: array of values to look up
+        default: weight for values that are not there
 
     Returns:
-        Pmf object
+        numpy array of weights, parallel to keys
     """
-    if name is None:
-        name = hist.name
+    keys = np.asarray(keys)
+    if len(xs) == 0:
+        return np.full(keys.shape, default, dtype=ws.dtype)
+    i = np.minimum(np.searchsorted(xs, keys), len(xs)-1)
+    return np.where(xs[i] == keys, ws[i], default)
 
-    # make a copy of the dictionary
-    d = dict(hist.get_dict())
-    pmf = Pmf(d, name)
-    pmf.normalize()
-    return pmf
 
+def _align(hist1, hist2):
+    """Aligns two histograms on the sorted union of their values.
 
-def pmf_from_cdf(cdf, name=None):
-    """Makes a normalized Pmf from a Cdf object.
+    Returns:
+        tuple of (union of values, freqs of hist1, freqs of hist2),
+        with zeros for values missing from one of them
+    """
+    xs1, ws1 = hist1.to_arrays()
+    xs2, ws2 = hist2.to_arrays()
+    xs = np.union1d(xs1, xs2)
+    dtype = np.result_type(ws1, ws2)
+    a = np.zeros(len(xs), dtype=dtype)
+    a[np.searchsorted(xs, xs1)] = ws1
+    b = np.zeros(len(xs), dtype=dtype)
+    b[np.searchsorted(xs, xs2)] = ws2
+    return xs, a, b
+
+
+def _multiset_op(hist1, hist2, op, name=None):
+    """Combines aligned frequencies with op and keeps the positive ones.
 
     Args:
-        cdf: Cdf object
-        name: string name for the new Pmf
+        hist1: Hist or ArrayHist; the result has its storage kind
+        hist2: Hist or ArrayHist
+        op: binary numpy ufunc
+        name: string name for the result; defaults to the name of hist1
 
     Returns:
-        Pmf object
+        new histogram
     """
     if name is None:
-        name = cdf.name
+        name = hist1.name
+    xs, a, b = _align(hist1, hist2)
+    ws = op(a, b)
+    keep = ws > 0
+    return _hist_like(hist1, xs[keep], ws[keep], name)
 
-    pmf = Pmf(name=name)
 
-    prev = 0.0
-    for val, prob in cdf.items():
-        pmf.incr(val, prob-prev)
-        prev = prob
+def _cdf_from_arrays(xs, ws, name=''):
+    """Makes a Cdf from sorted values and their freqs/probs."""
+    import cdf
+    if len(ws) == 0:
+        return cdf.Cdf([], [], name)
+    cs = np.cumsum(ws)
+    return cdf.Cdf(xs, cs / float(cs[-1]), name)
 
-    return pmf
 
+def _hist_like(like, xs, ws, name=''):
+    """Makes a histogram of the same storage kind as like from arrays."""
+    if isinstance(like, _ArrayWrapper):
+        return ArrayHist(xs, ws, name)
+    return Hist(dict(itertools.izip(xs.tolist(), ws.tolist())), name)
 
-def make_mixture(pmfs, name='mix'):
-    """Make a mixture distribution.
+
+def logsumexp(a):
+    """Computes log(sum(exp(a))) without overflow or underflow.
 
     Args:
-      pmfs: Pmf that maps from Pmfs to probs.
-      name: string name for the new Pmf.
+        a: array of logarithms
 
-    Returns: Pmf object.
+    Returns:
+        float
     """
-    mix = Pmf(name=name)
-    for pmf, prob in pmfs.items():
-        for x, p in pmf.items():
-            mix.incr(x, p * prob)
-    return mix
+    a = np.asarray(a, dtype=float)
+    if len(a) == 0:
+        return -np.inf
+    m = a.max()
+    if not np.isfinite(m):
+        return m
+    return m + math.log(np.exp(a - m).sum())
 
-def prob_range(pmf, low, high):
-    """Computes the total probability between low and high, inclusive.
-    
-    Args:
-        pmf: Pmf object
-        low: low value
-        high: high ValueError
-        
-    Returns:
-        float probability
+
+class _ArrayWrapper(_Wrapper):
     """
-    total = 0.0
-    for week in range(low, high+1):
-        total += pmf.prob(week)
-    return total
+    An object that contains a sorted array of values and a parallel
+    array of frequencies/probabilities.
 
-def condition_pmf(pmf, filter_func, name='conditional'):
-    """Computes a conditional PMF based on a filter function.
-    
-    Args:
-        pmf: Pmf object
-        filter_func: callable that takes a value from the Pmf and returns
-                     a boolean
-        name: string name for the new pmf
-        
-    Returns:
-        new Pmf object
+    Whole-distribution operations run as numpy reductions; point
+    updates through set/incr/remove cost O(n), so build with the
+    dict-backed classes and convert when the updates are done.
     """
-    cond_pmf = pmf.copy(name)
 
-    vals = [val for val in pmf.values() if filter_func(val)]
-    for val in vals:
-        cond_pmf.remove(val)
-    
-    cond_pmf.normalize()
-    return cond_pmf
+    __slots__ = ('xs', 'ws', 'name')
+
+    def __init__(self, xs=None, ws=None, name='', copy=True):
+        """Initializes the distribution.
+
+        Args:
+            xs: sequence of values
+            ws: sequence of freqs/probs, parallel to xs; if omitted,
+                every value counts once
+            name: string name
+            copy: if False, sorted unique arrays are kept rather than
+                  copied, so the distribution is a view of them and
+                  writes to it reach the caller's arrays
+        """
+        if xs is None:
+            xs = []
+        xs_arg, ws_arg = xs, ws
+        xs = np.asarray(xs)
+        if ws is None:
+            ws = np.ones(len(xs), dtype=int)
+        ws = np.asarray(ws)
+        if xs.shape != ws.shape:
+            raise ValueError('values and weights must have the same shape.')
+        self.xs, self.ws = _aggregate(xs, ws)
+        if copy:
+            self.xs = _unshared(self.xs, xs_arg)
+            self.ws = _unshared(self.ws, ws_arg)
+        self.name = name
+        _Wrapper.__init__(self)
+
+    @classmethod
+    def _wrap(cls, xs, ws, name=''):
+        """Wraps sorted unique arrays without checking or copying them."""
+        new = cls.__new__(cls)
+        new.xs, new.ws, new.name = xs, ws, name
+        _Wrapper.__init__(new)
+        return new
+
+    def __len__(self):
+        return len(self.xs)
+
+    def get_dict(self):
+        """Gets a new dictionary with the contents."""
+        return dict(self.items())
+
+    def values(self):
+        """Gets the sorted array of values."""
+        return self.xs
+
+    def items(self):
+        """Gets a sorted sequence of (value, freq/prob) pairs."""
+        xs, ws = self.to_arrays()
+        return zip(xs.tolist(), ws.tolist())
+
+    def iteritems(self):
+        """Iterates the (value, freq/prob) pairs in sorted order."""
+        xs, ws = self.to_arrays()
+        return itertools.izip(xs.tolist(), ws.tolist())
+
+    def to_arrays(self):
+        """Gets the contents as a pair of numpy arrays.
+
+        Returns:
+            tuple of (sorted values array, freqs/probs array)
+        """
+        return self.xs, self.ws
+
+    def _stored_arrays(self):
+        """Gets the (values, weights) arrays that save writes."""
+        return self.xs, self.ws
+
+    def render(self):
+        """Generates a sequence of points suitable for plotting.
+
+        Returns:
+            tuple of (sorted value array, freq/prob array)
+        """
+        return self.to_arrays()
+
+    def make_cdf(self, name=None):
+        """Makes a Cdf of this distribution.
+
+        Args:
+            name: string name for the Cdf
+
+        Returns:
+            cdf.Cdf object
+        """
+        if name is None:
+            name = self.name
+        xs, ws = self.to_arrays()
+        return _cdf_from_arrays(xs.copy(), ws, name)
+
+    def __str__(self):
+        xs, ws = self.to_arrays()
+        c = ""
+        for i in np.lexsort((xs, ws)):
+            c = c + "%s: %s\n" % (xs[i], ws[i])
+        return c
+
+    def _find(self, x):
+        """Returns (index, found) for the value x."""
+        if len(self.xs) == 0:
+            return 0, False
+        i = np.searchsorted(self.xs, x)
+        return i, i < len(self.xs) and self.xs[i] == x
+
+    def _promote(self, x, y):
+        """Widens the values and weights dtypes so that x and y can be
+        stored without loss."""
+        if len(self.xs):
+            a = _values_array([x])
+            if _mixed_kinds([self.xs, a]):
+                dtype = np.dtype(object)
+            else:
+                dtype = np.result_type(self.xs, a[0])
+            if dtype != self.xs.dtype:
+                self.xs = self.xs.astype(dtype)
+        dtype = np.result_type(self.ws, y)
+        if dtype != self.ws.dtype:
+            self.ws = self.ws.astype(dtype)
+
+    def set(self, x, y=0):
+        """sets the freq/prob associated with the value x.
+
+        Args:
+            x: number value
+            y: number freq or prob
+        """
+        self._promote(x, y)
+        i, found = self._find(x)
+        if len(self.xs) == 0:
+            self.xs = _values_array([x])
+            self.ws = np.array([y], dtype=self.ws.dtype)
+        elif found:
+            self.ws[i] = y
+        else:
+            self.xs = np.insert(self.xs, i, x)
+            self.ws = np.insert(self.ws, i, y)
+        self.changed()
+
+    def incr(self, x, term=1):
+        """increments the freq/prob associated with the value x.
+
+        Args:
+            x: number value
+            term: how much to increment by
+        """
+        i, found = self._find(x)
+        self.set(x, self.ws[i] + term if found else term)
+
+    def mult(self, x, factor):
+        """Scales the freq/prob associated with the value x.
+
+        Args:
+            x: number value
+            factor: how much to multiply by
+        """
+        i, found = self._find(x)
+        self.set(x, self.ws[i] * factor if found else 0 * factor)
+
+    def remove(self, x):
+        """removes a value.
+
+        Throws an exception if the value is not there.
+
+        Args:
+            x: value to remove
+        """
+        i, found = self._find(x)
+        if not found:
+            raise KeyError(x)
+        self.xs = np.delete(self.xs, i)
+        self.ws = np.delete(self.ws, i)
+        self.changed()
+
+    def total(self):
+        """Returns the total of the frequencies/probabilities."""
+        return self.ws.sum()
+
+    def maxlike(self):
+        """Returns the largest frequency/probability."""
+        return self.ws.max()
+
+
+class ArrayHist(_ArrayWrapper, _HistMethods):
+    """Represents a histogram as a sorted array of values and a
+    parallel array of integer frequencies.
+
+    Values must be sortable.
+    """
+
+    __slots__ = ()
+
+    def copy(self, name=None):
+        """Returns a copy of this ArrayHist.
+
+        Args:
+            name: string name for the new ArrayHist
+        """
+        if name is None:
+            name = self.name
+        return ArrayHist(self.xs.copy(), self.ws.copy(), name)
+
+    def freq(self, x):
+        """Gets the frequency associated with the value x.
+
+        Args:
+            x: number value
+
+        Returns:
+            int frequency
+        """
+        i, found = self._find(x)
+        return self.ws[i] if found else 0
+
+    def freqs(self):
+        """Gets the array of frequencies, in value order."""
+        return self.ws
+
+    def subtract(self, other):
+        """Subtracts the values in the given histogram from this histogram."""
+        xs, ws = other.to_arrays()
+        self.xs, self.ws = _aggregate(np.concatenate((self.xs, xs)),
+                                      np.concatenate((self.ws, -ws)))
+        self.changed()
+
+    def update(self, other):
+        """Adds the frequencies in the given histogram to this histogram."""
+        xs, ws = other.to_arrays()
+        self.xs, self.ws = _aggregate(np.concatenate((self.xs, xs)),
+                                      np.concatenate((self.ws, ws)))
+        self.changed()
+
+    def to_list(self):
+        """Expands the histogram into a sorted list of values."""
+        return self.expand_array().tolist()
+
+    def to_hist(self, name=None):
+        """Returns a dict-backed copy of this histogram.
+
+        Args:
+            name: string name for the new Hist
+        """
+        if name is None:
+            name = self.name
+        return Hist(self.get_dict(), name)
+
+
+class ArrayPmf(_ArrayWrapper, _PmfMethods):
+    """Represents a probability mass function as a sorted array of
+    values and a parallel array of probabilities.
+
+    Values must be sortable; mean and variance need numeric values.
+    ArrayPmfs are not necessarily normalized.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, xs=None, ws=None, name='', copy=True):
+        _ArrayWrapper.__init__(self, xs, ws, name, copy)
+        self.ws = self.ws.astype(float, copy=False)
+
+    def copy(self, name=None):
+        """Returns a copy of this ArrayPmf.
+
+        Args:
+            name: string name for the new ArrayPmf
+        """
+        if name is None:
+            name = self.name
+        return ArrayPmf(self.xs.copy(), self.ws.copy(), name)
+
+    def prob(self, x, default=0):
+        """Gets the probability associated with the value x.
+
+        Args:
+            x: number value
+            default: value to return if the key is not there
+
+        Returns:
+            float probability
+        """
+        i, found = self._find(x)
+        return self.ws[i] if found else default
+
+    def probs(self):
+        """Gets the array of probabilities, in value order."""
+        return self.ws
+
+    def normalize(self, fraction=1.0):
+        """normalizes this PMF so the sum of all probs is 1.
+
+        Args:
+            fraction: what the total should be after normalization
+        """
+        total = self.total()
+        if total == 0.0:
+            raise ValueError('total probability is zero.')
+        self.ws *= float(fraction) / total
+        self.changed()
+
+    def random(self):
+        """Chooses a random element from this PMF.
+
+        Returns:
+            float value from the Pmf
+        """
+        if len(self.xs) == 0:
+            raise ValueError('Pmf contains no values.')
+        cum = np.cumsum(self.ws)
+        i = np.searchsorted(cum, random.random() * cum[-1])
+        return self.xs[min(i, len(self.xs)-1)]
+
+    def mean(self):
+        """Computes the mean of a PMF.
+
+        Returns:
+            float mean
+        """
+        return float(np.dot(self.ws, self.xs))
+
+    def variance(self, mu=None):
+        """Computes the variance of a PMF.
+
+        Args:
+            mu: the point around which the variance is computed;
+                if omitted, computes the mean
+
+        Returns:
+            float variance
+        """
+        if mu is None:
+            mu = self.mean()
+        return float(np.dot(self.ws, (self.xs - mu)**2))
+
+    def log(self):
+        """Log transforms the probabilities."""
+        self.ws = np.log(self.ws / self.maxlike())
+        self.changed()
+
+    def exp(self):
+        """Exponentiates the probabilities."""
+        self.ws = np.exp(self.ws - self.maxlike())
+        self.changed()
+
+    def merge(self, other, weight=1.0):
+        """Adds the weighted probabilities of another Pmf to this one.
+
+        The result is not normalized; merging weighted components and
+        then calling normalize() yields their mixture.
+
+        Args:
+            other: Pmf or ArrayPmf
+            weight: factor applied to the probabilities of other
+        """
+        xs, ws = other.to_arrays()
+        self.xs, self.ws = _aggregate(np.concatenate((self.xs, xs)),
+                                      np.concatenate((self.ws, weight * ws)))
+        self.changed()
+
+    def make_sampler(self):
+        """Builds an AliasSampler for this Pmf.
+
+        The sampler is a snapshot; rebuild it after changing the Pmf.
+        """
+        return AliasSampler(self.xs, self.ws)
+
+    def to_pmf(self, name=None):
+        """Returns a dict-backed copy of this Pmf.
+
+        Args:
+            name: string name for the new Pmf
+        """
+        if name is None:
+            name = self.name
+        return Pmf(self.get_dict(), name)
+
+    def to_log_pmf(self, name=None):
+        """Returns a log-space copy of this Pmf.
+
+        Args:
+            name: string name for the new LogPmf
+        """
+        if name is None:
+            name = self.name
+        return LogPmf.from_probs(self.xs.copy(), self.ws, name)
+
+
+class LogPmf(_ArrayWrapper, _PmfMethods):
+    """Represents a probability mass function by the logarithms of its
+    probabilities.
+
+    The interface matches Pmf and speaks in linear probabilities;
+    they are computed from the stored logs only when they are read.
+    The exception is Pmf's log and exp, which LogPmf does not have:
+    the logs of probabilities are negative, so they cannot be stored
+    as probabilities here.  Use log_probs and mult_log instead.
+    Multiplying probabilities adds to the logs and normalize subtracts
+    their logsumexp, so long chains of updates do not underflow.
+    Normalize before reading linear probabilities if the logs may be
+    far below zero.
+
+    Attributes:
+        xs: sorted numpy array of values
+        ws: numpy array of log probabilities, parallel to xs
+        name: string name
+    """
+
+    __slots__ = ()
+
+    def __init__(self, xs=None, log_ps=None, name='', copy=True):
+        """Initializes the distribution.
+
+        Args:
+            xs: sequence of values
+            log_ps: sequence of log probabilities, parallel to xs; if
+                    omitted, every value has probability 1
+            name: string name
+            copy: if False, sorted unique arrays are kept rather than
+                  copied, as in ArrayPmf
+        """
+        if xs is None:
+            xs = []
+        xs_arg, log_ps_arg = xs, log_ps
+        xs = np.asarray(xs)
+        if log_ps is None:
+            log_ps = np.zeros(len(xs))
+        log_ps = np.asarray(log_ps, dtype=float)
+        if xs.shape != log_ps.shape:
+            raise ValueError('values and weights must have the same shape.')
+        self.xs, self.ws = _aggregate(xs, log_ps, np.logaddexp)
+        if copy:
+            self.xs = _unshared(self.xs, xs_arg)
+            self.ws = _unshared(self.ws, log_ps_arg)
+        self.name = name
+        _Wrapper.__init__(self)
+
+    @staticmethod
+    def from_probs(xs, ps, name=''):
+        """Makes a LogPmf from linear probabilities.
+
+        Args:
+            xs: sequence of values
+            ps: sequence of probabilities, parallel to xs
+            name: string name for the new LogPmf
+        """
+        with np.errstate(divide='ignore'):
+            return LogPmf(xs, np.log(np.asarray(ps, dtype=float)), name)
+
+    def copy(self, name=None):
+        """Returns a copy of this LogPmf.
+
+        Args:
+            name: string name for the new LogPmf
+        """
+        if name is None:
+            name = self.name
+        return LogPmf(self.xs.copy(), self.ws.copy(), name)
+
+    def to_arrays(self):
+        """Gets the contents as a pair of numpy arrays.
+
+        Returns:
+            tuple of (sorted values array, linear probabilities array)
+        """
+        return self.xs, np.exp(self.ws)
+
+    def prob(self, x, default=0):
+        """Gets the probability associated with the value x.
+
+        Args:
+            x: number value
+            default: value to return if the key is not there
+
+        Returns:
+            float probability
+        """
+        i, found = self._find(x)
+        return math.exp(self.ws[i]) if found else default
+
+    def log_prob(self, x, default=-np.inf):
+        """Gets the log probability associated with the value x.
+
+        Args:
+            x: number value
+            default: value to return if the key is not there
+
+        Returns:
+            float log probability
+        """
+        i, found = self._find(x)
+        return self.ws[i] if found else default
+
+    def probs(self):
+        """Gets the array of probabilities, in value order."""
+        return np.exp(self.ws)
+
+    def log_probs(self):
+        """Gets the array of log probabilities, in value order."""
+        return self.ws
+
+    def set(self, x, y=0):
+        """sets the probability associated with the value x.
+
+        Args:
+            x: number value
+            y: number probability
+        """
+        with np.errstate(divide='ignore'):
+            _ArrayWrapper.set(self, x, np.log(float(y)))
+
+    def incr(self, x, term=1):
+        """increments the probability associated with the value x.
+
+        Args:
+            x: number value
+            term: how much to increment by
+        """
+        self.set(x, self.prob(x) + term)
+
+    def mult(self, x, factor):
+        """Scales the probability associated with the value x.
+
+        Args:
+            x: number value
+            factor: how much to multiply by
+        """
+        i, found = self._find(x)
+        if found:
+            with np.errstate(divide='ignore'):
+                self.ws[i] += np.log(float(factor))
+            self.changed()
+        else:
+            _ArrayWrapper.set(self, x, -np.inf)
+
+    def mult_log(self, log_factors):
+        """Multiplies every probability by exp of the given logs.
+
+        Args:
+            log_factors: number or array parallel to xs, e.g. the log
+                         likelihoods of the data under each value
+        """
+        self.ws = self.ws + log_factors
+        self.changed()
+
+    def merge(self, other, weight=1.0):
+        """Adds the weighted probabilities of another Pmf to this one.
+
+        The result is not normalized; merging weighted components and
+        then calling normalize() yields their mixture.
+
+        Args:
+            other: Pmf, ArrayPmf or LogPmf
+            weight: factor applied to the probabilities of other
+        """
+        with np.errstate(divide='ignore'):
+            if isinstance(other, LogPmf):
+                xs, log_ps = other.xs, other.ws + np.log(float(weight))
+            else:
+                xs, ps = other.to_arrays()
+                log_ps = np.log(weight * ps)
+        self.xs, self.ws = _aggregate(np.concatenate((self.xs, xs)),
+                                      np.concatenate((self.ws, log_ps)),
+                                      np.logaddexp)
+        self.changed()
+
+    def total(self):
+        """Returns the total of the probabilities."""
+        return math.exp(self.log_total())
+
+    def log_total(self):
+        """Returns the log of the total of the probabilities."""
+        return logsumexp(self.ws)
+
+    def maxlike(self):
+        """Returns the largest probability."""
+        return math.exp(self.ws.max())
+
+    def normalize(self, fraction=1.0):
+        """normalizes this PMF so the sum of all probs is 1.
+
+        Args:
+            fraction: what the total should be after normalization
+        """
+        log_total = self.log_total()
+        if log_total == -np.inf:
+            raise ValueError('total probability is zero.')
+        self.ws = self.ws - (log_total - math.log(fraction))
+        self.changed()
+
+    def _relative_probs(self):
+        """Returns (probs scaled so the largest is 1, log of the scale)."""
+        m = self.ws.max()
+        return np.exp(self.ws - m), m
+
+    def mean(self):
+        """Computes the mean of a PMF.
+
+        Returns:
+            float mean
+        """
+        ps, m = self._relative_probs()
+        return float(np.dot(ps, self.xs) * math.exp(m))
+
+    def variance(self, mu=None):
+        """Computes the variance of a PMF.
+
+        Args:
+            mu: the point around which the variance is computed;
+                if omitted, computes the mean
+
+        Returns:
+            float variance
+        """
+        if mu is None:
+            mu = self.mean()
+        ps, m = self._relative_probs()
+        return float(np.dot(ps, (self.xs - mu)**2) * math.exp(m))
+
+    def make_sampler(self):
+        """Builds an AliasSampler for this Pmf.
+
+        The sampler is a snapshot; rebuild it after changing the Pmf.
+        """
+        return AliasSampler(self.xs, self._relative_probs()[0])
+
+    def random(self):
+        """Chooses a random element from this PMF.
+
+        Draws from the cached sampler, so repeated calls cost O(1)
+        until the next mutation.
+        """
+        if len(self.xs) == 0:
+            raise ValueError('Pmf contains no values.')
+        return self.sampler().random()
+
+    def to_pmf(self, name=None):
+        """Returns a dict-backed copy in linear space.
+
+        Args:
+            name: string name for the new Pmf
+        """
+        if name is None:
+            name = self.name
+        return Pmf(self.get_dict(), name)
+
+    def to_array_pmf(self, name=None):
+        """Returns an array-backed copy in linear space.
+
+        Args:
+            name: string name for the new ArrayPmf
+        """
+        if name is None:
+            name = self.name
+        return ArrayPmf(self.xs.copy(), self.probs(), name)
+
+
+class PackedPmfs(object):
+    """Stores many small Pmfs in one shared pair of arrays.
+
+    Pmf i owns xs[offsets[i]:offsets[i+1]] and the parallel slice of
+    ps, with its values sorted.  Per-Pmf reductions run over all Pmfs
+    at once with np.add.reduceat, and indexing returns an ArrayPmf
+    whose arrays are views into the shared ones.
+
+    Attributes:
+        xs: numpy array of the values of all Pmfs
+        ps: numpy array of probabilities, parallel to xs
+        offsets: int numpy array with len(self)+1 entries
+        names: list of string names, or None
+    """
+
+    def __init__(self, xs, ps, offsets, names=None):
+        self.xs = np.asarray(xs)
+        self.ps = np.asarray(ps, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=np.intp)
+        self.names = names
+        if self.xs.shape != self.ps.shape:
+            raise ValueError('values and weights must have the same shape.')
+        if self.offsets[0] != 0 or self.offsets[-1] != len(self.xs):
+            raise ValueError('offsets must run from 0 to len(xs).')
+
+    @staticmethod
+    def from_pmfs(pmfs):
+        """Packs a sequence of Pmfs.
+
+        Args:
+            pmfs: sequence of Pmf or ArrayPmf objects
+
+        Returns:
+            PackedPmfs
+        """
+        arrays = [pmf.to_arrays() for pmf in pmfs]
+        lengths = [len(xs) for xs, _ in arrays]
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        if not arrays:
+            return PackedPmfs([], [], offsets, [])
+        xs = np.concatenate([xs for xs, _ in arrays])
+        ps = np.concatenate([ps for _, ps in arrays])
+        return PackedPmfs(xs, ps, offsets, [pmf.name for pmf in pmfs])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """Gets Pmf i as an ArrayPmf that shares the packed arrays."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        sl = slice(self.offsets[i], self.offsets[i+1])
+        name = self.names[i] if self.names is not None else ''
+        return ArrayPmf(self.xs[sl], self.ps[sl], name, copy=False)
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def _reduce(self, a):
+        """Sums a over each Pmf's slice; empty slices sum to 0."""
+        starts = self.offsets[:-1]
+        nonempty = starts < self.offsets[1:]
+        sums = np.zeros(len(self), dtype=np.result_type(a, float))
+        if len(a):
+            sums[nonempty] = np.add.reduceat(a, starts[nonempty])
+        return sums
+
+    def _spread(self, per_pmf):
+        """Repeats one number per Pmf across the Pmf's slice."""
+        return np.repeat(per_pmf, np.diff(self.offsets))
+
+    def totals(self):
+        """Returns the array of total probabilities, one per Pmf."""
+        return self._reduce(self.ps)
+
+    def normalize(self):
+        """Normalizes every Pmf in place."""
+        totals = self.totals()
+        if np.any(totals[np.diff(self.offsets) > 0] == 0):
+            raise ValueError('total probability is zero.')
+        totals[totals == 0] = 1.0
+        self.ps /= self._spread(totals)
+
+    def means(self):
+        """Returns the array of means, one per Pmf."""
+        return self._reduce(self.ps * self.xs)
+
+    def variances(self):
+        """Returns the array of variances around the means."""
+        mus = self._spread(self.means())
+        return self._reduce(self.ps * (self.xs - mus)**2)
+
+
+_LOADERS = {
+    'Hist': lambda xs, ws, name: ArrayHist(xs, ws, name, copy=False).to_hist(),
+    'Pmf': lambda xs, ws, name: ArrayPmf(xs, ws, name, copy=False).to_pmf(),
+    'ArrayHist': lambda xs, ws, name: ArrayHist(xs, ws, name, copy=False),
+    'ArrayPmf': lambda xs, ws, name: ArrayPmf(xs, ws, name, copy=False),
+    'LogPmf': lambda xs, ws, name: LogPmf(xs, ws, name, copy=False),
+}
+
+
+def load(path, mmap_mode='r'):
+    """Loads a distribution written by save.
+
+    With a memmap mode the arrays stay in the file and the result is
+    array-backed, so a saved Hist loads as an ArrayHist and a saved Pmf
+    as an ArrayPmf; processes that map the same file share its pages.
+    With mmap_mode=None the arrays are read into memory and the saved
+    type is restored.
+
+    The default mode 'r' maps the arrays read-only, so methods that
+    modify them in place, such as normalize or incr, raise numpy's
+    read-only ValueError.  To modify the result, load it with 'c',
+    which copies pages as they are written and leaves the file alone,
+    or with None.
+
+    Args:
+        path: string filename
+        mmap_mode: None, or a numpy memmap mode: 'r' (read-only),
+                   'c' (copy-on-write) or 'r+' (write through)
+
+    Returns:
+        Hist, Pmf, ArrayHist, ArrayPmf or LogPmf
+    """
+    kind, name, arrays = serialize.read_arrays(path, mmap_mode)
+    if kind not in _LOADERS:
+        raise ValueError('%s does not hold a Hist or Pmf.' % path)
+    if mmap_mode is not None:
+        kind = {'Hist': 'ArrayHist', 'Pmf': 'ArrayPmf'}.get(kind, kind)
+    return _LOADERS[kind](arrays['xs'], arrays['ws'], name)
+
+
+def random_state(rng=None):
+    """Turns a seed into a numpy RandomState.
+
+    Args:
+        rng: None for the global numpy generator, an int seed, or a
+             RandomState, which is returned unchanged
+
+    Returns:
+        numpy RandomState
+    """
+    if rng is None:
+        return np.random.mtrand._rand
+    if isinstance(rng, numbers.Integral):
+        return np.random.RandomState(rng)
+    return rng
+
+
+class AliasSampler(object):
+    """Draws values from a discrete distribution with Walker's alias
+    method.
+
+    Building the tables takes O(k) for k values; each draw then costs
+    one uniform integer, one uniform float and two array lookups.
+
+    Attributes:
+        xs: numpy array of values
+        cutoffs: numpy array of probabilities of keeping each column
+        aliases: numpy array of indices used when a column is rejected
+    """
+
+    def __init__(self, xs, ps):
+        """Builds the alias tables with Vose's algorithm.
+
+        Args:
+            xs: sequence of values
+            ps: sequence of probabilities or weights, parallel to xs
+        """
+        ps = np.asarray(ps, dtype=float)
+        if len(ps) == 0:
+            raise ValueError('Pmf contains no values.')
+        if np.any(ps < 0):
+            raise ValueError('probabilities must be non-negative.')
+        total = ps.sum()
+        if total == 0.0:
+            raise ValueError('total probability is zero.')
+
+        n = len(ps)
+        scaled = (ps * n / total).tolist()
+        cutoffs = [1.0] * n
+        aliases = range(n)
+        small = [i for i, q in enumerate(scaled) if q < 1.0]
+        large = [i for i, q in enumerate(scaled) if q >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            cutoffs[s] = scaled[s]
+            aliases[s] = l
+            scaled[l] += scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        self.xs = np.asarray(xs)
+        self.cutoffs = np.array(cutoffs)
+        self.aliases = np.array(aliases, dtype=np.intp)
+
+    def sample(self, n, rng=None):
+        """Draws a random sample.
+
+        Args:
+            n: int length of the sample
+            rng: numpy RandomState or int seed; if omitted, uses the
+                 global numpy generator
+
+        Returns:
+            numpy array of values
+        """
+        rng = random_state(rng)
+        i = rng.randint(0, len(self.cutoffs), size=n)
+        keep = rng.random_sample(n) < self.cutoffs[i]
+        return self.xs[np.where(keep, i, self.aliases[i])]
+
+    def random(self, rng=None):
+        """Chooses a single random value."""
+        return self.sample(1, rng)[0]
+
+
+def _count_values(t):
+    """Counts the distinct values of a numeric sequence with numpy.
+
+    Integer data with a compact range is counted with bincount; other
+    numeric data with a sort and unique.
+
+    Args:
+        t: numpy array, list or tuple
+
+    Returns:
+        tuple of (sorted unique values, int counts) arrays, or None if
+        t is not a one-dimensional numeric sequence
+    """
+    if not isinstance(t, np.ndarray):
+        if not isinstance(t, (list, tuple)):
+            return None
+        t = np.asarray(t)
+    if t.ndim != 1 or t.dtype.kind not in 'biuf':
+        return None
+
+    if t.dtype.kind in 'iu' and len(t):
+        low, high = t.min(), t.max()
+        # Python ints, since the span can overflow the array's dtype
+        if int(high) - int(low) <= 2 * len(t):
+            if t.dtype.kind == 'u':
+                offsets = (t - low).astype(np.intp)
+            else:
+                # widen first, so that narrow signed types do not wrap
+                offsets = t.astype(np.intp) - int(low)
+            counts = np.bincount(offsets)
+            xs = np.flatnonzero(counts)
+            if t.dtype.kind == 'u':
+                values = xs.astype(t.dtype) + low
+            else:
+                values = (xs + int(low)).astype(t.dtype)
+            return values, counts[xs]
+
+    return np.unique(t, return_counts=True)
+
+
+def _count_dict(t):
+    """Counts the values of any iterable into a new dictionary."""
+    counts = _count_values(t)
+    if counts is not None:
+        xs, freqs = counts
+        return dict(itertools.izip(xs.tolist(), freqs.tolist()))
+
+    d = {}
+    get = d.get
+    for x in t:
+        d[x] = get(x, 0) + 1
+    return d
+
+
+def hist_from_list(t, name=''):
+    """Makes a histogram from an unsorted sequence of values.
+
+    Numeric lists and numpy arrays are counted in bulk with numpy;
+    other iterables are counted in a single pass.
+
+    Args:
+        t: sequence of numbers
+        name: string name for this histogram
+
+    Returns:
+        Hist object
+    """
+    return Hist(_count_dict(t), name)
+
+
+def array_hist_from_list(t, name=''):
+    """Makes an ArrayHist from an unsorted sequence of values.
+
+    Args:
+        t: sequence of sortable values
+        name: string name for this histogram
+
+    Returns:
+        ArrayHist object
+    """
+    counts = _count_values(t)
+    if counts is None:
+        return Hist(_count_dict(t)).to_array_hist(name)
+    return ArrayHist(counts[0], counts[1], name)
+
+
+def iter_chunks(source, chunksize=1000000):
+    """Splits a large input into chunks.
+
+    Args:
+        source: numpy array, list or tuple, which is sliced; a filename
+                or file object, which is read chunksize lines at a
+                time; or any other iterable
+        chunksize: int number of elements per chunk
+
+    Returns:
+        iterator of sequences
+    """
+    if isinstance(source, basestring):
+        with open(source) as fp:
+            for chunk in iter_chunks(fp, chunksize):
+                yield chunk
+        return
+
+    if isinstance(source, (np.ndarray, list, tuple)):
+        for i in xrange(0, len(source), chunksize):
+            yield source[i:i+chunksize]
+        return
+
+    it = iter(source)
+    while True:
+        chunk = list(itertools.islice(it, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _hist_from_chunk(args):
+    """Worker for hist_from_chunks; module level so it can be pickled."""
+    chunk, convert = args
+    if convert is not None:
+        chunk = [convert(x) for x in chunk]
+    return hist_from_list(chunk)
+
+
+def hist_from_chunks(chunks, name='', processes=None, convert=None):
+    """Makes a histogram by counting chunks of values in a process pool.
+
+    Each worker builds a partial Hist; the partial Hists are merged
+    as they arrive.  The pool pays off when per-value work dominates,
+    e.g. parsing lines or hashing Python objects; a numeric array in
+    memory is counted faster by hist_from_list than it can be sent
+    to the workers.
+
+    Args:
+        chunks: iterable of sequences of values, e.g. from iter_chunks
+        name: string name for this histogram
+        processes: int number of worker processes; if omitted, uses
+                   the number of CPUs; 1 counts in this process
+        convert: picklable callable applied to every value before it
+                 is counted, e.g. float for the lines of a file
+
+    Returns:
+        Hist object
+    """
+    hist = Hist(name=name)
+    tasks = ((chunk, convert) for chunk in chunks)
+    if processes == 1:
+        for part in itertools.imap(_hist_from_chunk, tasks):
+            hist.update(part)
+        return hist
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for part in pool.imap_unordered(_hist_from_chunk, tasks):
+            hist.update(part)
+    finally:
+        pool.close()
+        pool.join()
+    return hist
+
+
+def parallel_hist_from_list(source, name='', processes=None,
+                            chunksize=1000000, convert=None):
+    """Makes a histogram from a large input using a process pool.
+
+    Args:
+        source: numpy array, sequence, filename, file object or other
+                iterable of values; see iter_chunks
+        name: string name for this histogram
+        processes: int number of worker processes
+        chunksize: int number of values counted by each task
+        convert: picklable callable applied to every value
+
+    Returns:
+        Hist object
+    """
+    return hist_from_chunks(iter_chunks(source, chunksize), name,
+                            processes, convert)
+
+
+def hist_from_dict(d, name=''):
+    """Makes a histogram from a map from values to frequencies.
+
+    Args:
+        d: dictionary that maps values to frequencies
+        name: string name for this histogram
+
+    Returns:
+        Hist object
+    """
+    return Hist(d, name)
+
+
+def pmf_from_list(t, name=''):
+    """Makes a PMF from an unsorted sequence of values.
+
+    Args:
+        t: sequence of numbers
+        name: string name for this PMF
+
+    Returns:
+        Pmf object
+    """
+    pmf = Pmf(_count_dict(t), name)
+    pmf.normalize()
+    return pmf
+
+
+def array_pmf_from_list(t, name=''):
+    """Makes an ArrayPmf from an unsorted sequence of values.
+
+    Args:
+        t: sequence of sortable values
+        name: string name for this PMF
+
+    Returns:
+        ArrayPmf object
+    """
+    pmf = array_hist_from_list(t, name)
+    pmf = ArrayPmf(pmf.xs, pmf.ws, name)
+    pmf.normalize()
+    return pmf
+
+
+def _weighted_arrays(values, weights):
+    """Sorts values and totals the weights of repeated values.
+
+    Records with a NaN value or weight are dropped, as are records
+    with zero weight.
+
+    Args:
+        values: sequence or numpy array of sortable values
+        weights: sequence or numpy array of nonnegative weights,
+                 parallel to values
+
+    Returns:
+        tuple of (sorted unique values, float weights) arrays
+    """
+    xs = np.asarray(values)
+    ws = np.asarray(weights, dtype=float)
+    if xs.shape != ws.shape or xs.ndim != 1:
+        raise ValueError('values and weights must be 1-D and the same '
+                         'length.')
+    ws = np.where(np.isnan(ws), 0.0, ws)
+    if np.any(ws < 0):
+        raise ValueError('weights must be nonnegative.')
+    keep = ws > 0
+    if xs.dtype.kind == 'f':
+        keep &= ~np.isnan(xs)
+    return _aggregate(xs[keep], ws[keep])
+
+
+def hist_from_weighted(values, weights, name=''):
+    """Makes a histogram from values and their sampling weights.
+
+    Each value counts as many times as its weight, e.g. the finalwgt
+    of a survey record; repeated values are summed with one sort
+    rather than a loop.
+
+    Args:
+        values: sequence or numpy array of values
+        weights: sequence or numpy array of weights, parallel to values
+        name: string name for this histogram
+
+    Returns:
+        Hist object with float frequencies
+    """
+    xs, ws = _weighted_arrays(values, weights)
+    return Hist(dict(itertools.izip(xs.tolist(), ws.tolist())), name)
+
+
+def array_hist_from_weighted(values, weights, name=''):
+    """Makes an ArrayHist from values and their sampling weights.
+
+    Args:
+        values: sequence or numpy array of sortable values
+        weights: sequence or numpy array of weights, parallel to values
+        name: string name for this histogram
+
+    Returns:
+        ArrayHist object with float frequencies
+    """
+    xs, ws = _weighted_arrays(values, weights)
+    return ArrayHist(xs, ws, name)
+
+
+def pmf_from_weighted(values, weights, name=''):
+    """Makes a PMF from values and their sampling weights.
+
+    Args:
+        values: sequence or numpy array of values
+        weights: sequence or numpy array of weights, parallel to values
+        name: string name for this PMF
+
+    Returns:
+        Pmf object
+    """
+    xs, ws = _weighted_arrays(values, weights)
+    ps = ws / ws.sum()
+    return Pmf(dict(itertools.izip(xs.tolist(), ps.tolist())), name)
+
+
+def array_pmf_from_weighted(values, weights, name=''):
+    """Makes an ArrayPmf from values and their sampling weights.
+
+    Args:
+        values: sequence or numpy array of sortable values
+        weights: sequence or numpy array of weights, parallel to values
+        name: string name for this PMF
+
+    Returns:
+        ArrayPmf object
+    """
+    xs, ws = _weighted_arrays(values, weights)
+    return ArrayPmf(xs, ws / ws.sum(), name)
+
+
+def weighted_mean(values, weights):
+    """Computes the mean of values weighted by their sampling weights.
+
+    Args:
+        values: sequence or numpy array of numbers
+        weights: sequence or numpy array of weights, parallel to values
+
+    Returns:
+        float mean
+    """
+    xs, ws = _weighted_arrays(values, weights)
+    return float(np.dot(xs, ws) / ws.sum())
+
+
+def weighted_variance(values, weights, mu=None):
+    """Computes the variance of values weighted by their sampling weights.
+
+    Args:
+        values: sequence or numpy array of numbers
+        weights: sequence or numpy array of weights, parallel to values
+        mu: the point around which the variance is computed;
+            if omitted, computes the weighted mean
+
+    Returns:
+        float variance
+    """
+    xs, ws = _weighted_arrays(values, weights)
+    if mu is None:
+        mu = np.dot(xs, ws) / ws.sum()
+    return float(np.dot((xs - mu) ** 2, ws) / ws.sum())
+
+
+def pmf_from_dict(d, name=''):
+    """Makes a PMF from a map from values to probabilities.
+
+    Args:
+        d: dictionary that maps values to probabilities
+        name: string name for this PMF
+
+    Returns:
+        Pmf object
+    """
+    pmf = Pmf(d, name)
+    pmf.normalize()
+    return pmf
+
+
+def pmf_from_hist(hist, name=None):
+    """Makes a normalized PMF from a Hist object.
+
+    Args:
+        hist: Hist object
+        name: string name
+
+    Returns:
+        Pmf object
+    """
+    if name is None:
+        name = hist.name
+
+    # make a copy of the dictionary
+    d = dict(hist.get_dict())
+    pmf = Pmf(d, name)
+    pmf.normalize()
+    return pmf
+
+
+def pmf_from_cdf(cdf, name=None):
+    """Makes a normalized Pmf from a Cdf object.
+
+    Args:
+        cdf: Cdf object
+        name: string name for the new Pmf
+
+    Returns:
+        Pmf object
+    """
+    if name is None:
+        name = cdf.name
+
+    pmf = Pmf(name=name)
+
+    prev = 0.0
+    for val, prob in cdf.items():
+        pmf.incr(val, prob-prev)
+        prev = prob
+
+    return pmf
+
+
+def make_mixture(pmfs, name='mix'):
+    """Make a mixture distribution.
+
+    The component supports are aligned on their sorted union once and
+    the weighted probabilities are summed per value with bincount, so
+    time and memory grow with the total size of the supports rather
+    than with components times values.
+
+    Args:
+      pmfs: Pmf that maps from Pmfs to probs.
+      name: string name for the new Pmf.
+
+    Returns: Pmf object.
+    """
+    components = pmfs.items()
+    arrays = [pmf.to_arrays() for pmf, _ in components]
+    if not arrays:
+        return Pmf(name=name)
+
+    if _mixed_kinds([xs for xs, _ in arrays]):
+        # values that numpy cannot combine are mixed one at a time
+        mix = Pmf(name=name)
+        for pmf, prob in components:
+            mix.merge(pmf, prob)
+        return mix
+
+    data = np.concatenate([ps for _, ps in arrays])
+    all_xs = np.concatenate([xs for xs, _ in arrays])
+    xs, cols = np.unique(all_xs, return_inverse=True)
+    weights = np.array([prob for _, prob in components], dtype=float)
+    rows = np.repeat(np.arange(len(arrays)), [len(x) for x, _ in arrays])
+    ps = np.bincount(cols, weights=data * weights[rows], minlength=len(xs))
+    return _pmf_like(None, xs, ps, name)
+
+
+def _pmf_like(like, xs, ps, name=''):
+    """Makes a Pmf of the same storage kind as like from arrays."""
+    if isinstance(like, _ArrayWrapper):
+        return ArrayPmf(xs, ps, name)
+    return Pmf(dict(itertools.izip(xs.tolist(), ps.tolist())), name)
+
+
+def _on_lattice(xs):
+    """Checks whether a sorted array of values are all integers."""
+    if xs.dtype.kind in 'iu':
+        return True
+    return xs.dtype.kind == 'f' and bool(np.all(xs == np.round(xs)))
+
+
+def _widen(xs):
+    """Converts integer values to a wide signed dtype, so that sums
+    and negations do not wrap around."""
+    if xs.dtype.kind in 'biu':
+        return xs.astype(np.result_type(xs, np.int64))
+    return xs
+
+
+def _convolve(a, b, exact=False):
+    """Convolves two arrays of nonnegative weights.
+
+    Long arrays are convolved with an FFT unless exact is set.  The
+    FFT result has an absolute error of roughly eps * size times the
+    largest weight, so entries smaller than that are not resolved;
+    negative roundoff is clipped to zero.
+    """
+    if exact or min(len(a), len(b)) < 64:
+        return np.convolve(a, b)
+    n = len(a) + len(b) - 1
+    size = 1 << (n - 1).bit_length()
+    c = np.fft.irfft(np.fft.rfft(a, size) * np.fft.rfft(b, size), size)[:n]
+    return np.maximum(c, 0, out=c)
+
+
+def _add_arrays(xs1, ps1, xs2, ps2, exact=False):
+    """Computes the distribution of a sum from sorted value arrays.
+
+    Integer supports whose combined range is small compared to the
+    number of pairs are convolved as dense vectors; other supports
+    form all pairwise sums, sort them and merge equal values.
+
+    Args:
+        exact: boolean, whether to convolve directly instead of with
+               an FFT; see _convolve
+
+    Returns:
+        tuple of (sorted values, probabilities)
+    """
+    if len(xs1) == 0 or len(xs2) == 0:
+        return np.array([]), np.array([])
+    xs1, xs2 = _widen(xs1), _widen(xs2)
+
+    span1 = int(xs1[-1] - xs1[0]) + 1 if _on_lattice(xs1) else None
+    span2 = int(xs2[-1] - xs2[0]) + 1 if _on_lattice(xs2) else None
+    if span1 and span2:
+        span = span1 + span2
+        if span * math.log(span, 2) < len(xs1) * len(xs2):
+            i1 = (xs1 - xs1[0]).astype(np.intp)
+            i2 = (xs2 - xs2[0]).astype(np.intp)
+            dense1 = np.zeros(span1)
+            dense1[i1] = ps1
+            dense2 = np.zeros(span2)
+            dense2[i2] = ps2
+            ps = _convolve(dense1, dense2, exact)
+            # the FFT smears roundoff over impossible sums, so the
+            # support comes from convolving the indicators of the
+            # values, whose entries are whole counts
+            ind1 = np.zeros(span1)
+            ind1[i1] = 1
+            ind2 = np.zeros(span2)
+            ind2[i2] = 1
+            i = np.flatnonzero(_convolve(ind1, ind2, exact) > 0.5)
+            xs = (i + (xs1[0] + xs2[0])).astype(np.result_type(xs1, xs2))
+            return xs, ps[i]
+
+    xs = np.add.outer(xs1, xs2).ravel()
+    ps = np.multiply.outer(ps1, ps2).ravel()
+    return _aggregate(xs, ps)
+
+
+def add_pmfs(pmf1, pmf2, name='', exact=False):
+    """Computes the distribution of the sum of independent values.
+
+    Long integer supports are convolved with an FFT, which keeps
+    every possible sum but resolves probabilities only down to about
+    1e-16 of the largest one; smaller tail probabilities come out as
+    roundoff or zero.  Pass exact=True to convolve directly, which is
+    slower for long supports but accurate in the tails.
+
+    Args:
+        pmf1: Pmf or ArrayPmf
+        pmf2: Pmf or ArrayPmf
+        name: string name for the new Pmf
+        exact: boolean, whether to avoid the FFT
+
+    Returns:
+        Pmf of the same storage kind as pmf1
+    """
+    xs1, ps1 = pmf1.to_arrays()
+    xs2, ps2 = pmf2.to_arrays()
+    xs, ps = _add_arrays(xs1, ps1, xs2, ps2, exact)
+    return _pmf_like(pmf1, xs, ps, name)
+
+
+def subtract_pmfs(pmf1, pmf2, name='', exact=False):
+    """Computes the distribution of the difference of independent values.
+
+    Args:
+        pmf1: Pmf or ArrayPmf
+        pmf2: Pmf or ArrayPmf
+        name: string name for the new Pmf
+        exact: boolean, whether to avoid the FFT; see add_pmfs
+
+    Returns:
+        Pmf of the same storage kind as pmf1
+    """
+    xs1, ps1 = pmf1.to_arrays()
+    xs2, ps2 = pmf2.to_arrays()
+    xs, ps = _add_arrays(xs1, ps1, -_widen(xs2)[::-1], ps2[::-1], exact)
+    return _pmf_like(pmf1, xs, ps, name)
+
+
+def sum_of_iid(pmf, k, name='', exact=False):
+    """Computes the distribution of the sum of k independent draws.
+
+    Uses repeated squaring, so it takes O(log k) convolutions.  As in
+    add_pmfs, the FFT resolves probabilities only down to about 1e-16
+    of the largest; the far tails of a large sum need exact=True.
+
+    Args:
+        pmf: Pmf or ArrayPmf
+        k: int number of draws, at least 1
+        name: string name for the new Pmf
+        exact: boolean, whether to avoid the FFT
+
+    Returns:
+        Pmf of the same storage kind as pmf
+    """
+    if k < 1:
+        raise ValueError('k must be at least 1.')
+    result = None
+    xs, ps = pmf.to_arrays()
+    while k:
+        if k & 1:
+            if result is None:
+                result = xs, ps
+            else:
+                result = _add_arrays(result[0], result[1], xs, ps, exact)
+        k >>= 1
+        if k:
+            xs, ps = _add_arrays(xs, ps, xs, ps, exact)
+    return _pmf_like(pmf, result[0], result[1], name)
+
+
+def _cdfs_on_union(pmf1, pmf2):
+    """Evaluates the normalized CDFs of two Pmfs on their joint support.
+
+    Returns:
+        tuple of (sorted union of values, CDF of pmf1, CDF of pmf2,
+        counts of values with positive probability in pmf1 at or
+        below each value, the same counts for pmf2)
+    """
+    xs1, ps1 = pmf1.to_arrays()
+    xs2, ps2 = pmf2.to_arrays()
+    xs = np.union1d(xs1, xs2)
+    cdfs, counts = [], []
+    for vals, ps in ((xs1, ps1), (xs2, ps2)):
+        i = np.searchsorted(vals, xs, side='right')
+        cs = np.concatenate(([0.0], np.cumsum(ps) / float(ps.sum())))
+        ns = np.concatenate(([0], np.cumsum(ps > 0)))
+        cdfs.append(cs[i])
+        counts.append(ns[i])
+    return xs, cdfs[0], cdfs[1], counts[0], counts[1]
+
+
+def _extreme_support(ns1, ns2, lowest):
+    """Finds the values the max or min of two variables can take.
+
+    Differencing the CDF of the max or min leaves roundoff where the
+    probability is zero, so the support is worked out from the counts
+    of possible values instead: x is possible if one variable can be x
+    and the other can be at or below it (for the max) or at or above it
+    (for the min).
+
+    Args:
+        ns1: int array of counts for the first variable, from
+             _cdfs_on_union
+        ns2: the same for the second variable
+        lowest: False for the max, True for the min
+
+    Returns:
+        boolean array parallel to the union of values
+    """
+    if len(ns1) == 0:
+        return np.zeros(0, dtype=bool)
+    at1 = np.diff(np.concatenate(([0], ns1))) > 0
+    at2 = np.diff(np.concatenate(([0], ns2))) > 0
+    if lowest:
+        ns1 = ns1[-1] - ns1 + at1
+        ns2 = ns2[-1] - ns2 + at2
+    return (at1 & (ns2 > 0)) | (at2 & (ns1 > 0))
+
+
+def _pmf_from_cdf_array(like, xs, cs, keep, name):
+    """Differences a CDF evaluated at xs and keeps the marked values."""
+    ps = np.diff(np.concatenate(([0.0], cs)))
+    return _pmf_like(like, xs[keep], np.maximum(ps[keep], 0), name)
+
+
+def max_pmfs(pmf1, pmf2, name=''):
+    """Computes the distribution of the max of independent values.
+
+    Args:
+        pmf1: Pmf or ArrayPmf
+        pmf2: Pmf or ArrayPmf
+        name: string name for the new Pmf
+
+    Returns:
+        normalized Pmf of the same storage kind as pmf1
+    """
+    xs, cs1, cs2, ns1, ns2 = _cdfs_on_union(pmf1, pmf2)
+    keep = _extreme_support(ns1, ns2, lowest=False)
+    return _pmf_from_cdf_array(pmf1, xs, cs1 * cs2, keep, name)
+
+
+def min_pmfs(pmf1, pmf2, name=''):
+    """Computes the distribution of the min of independent values.
+
+    Args:
+        pmf1: Pmf or ArrayPmf
+        pmf2: Pmf or ArrayPmf
+        name: string name for the new Pmf
+
+    Returns:
+        normalized Pmf of the same storage kind as pmf1
+    """
+    xs, cs1, cs2, ns1, ns2 = _cdfs_on_union(pmf1, pmf2)
+    keep = _extreme_support(ns1, ns2, lowest=True)
+    cs = 1 - (1 - cs1) * (1 - cs2)
+    return _pmf_from_cdf_array(pmf1, xs, cs, keep, name)
+
+
+def prob_range(pmf, low, high):
+    """Computes the total probability between low and high, inclusive.
+
+    Uses the prefix-sum index of the Pmf, so it works for float values
+    and costs O(log n) per query; see Pmf.prob_range for other bounds
+    and arrays of queries.
+    
+    Args:
+        pmf: Pmf object
+        low: low value
+        high: high ValueError
+        
+    Returns:
+        float probability
+    """
+    return pmf.prob_range(low, high)
+
+def condition_pmf(pmf, filter_func, name='conditional'):
+    """Computes a conditional PMF based on a filter function.
+    
+    Args:
+        pmf: Pmf object
+        filter_func: callable that takes a value from the Pmf and returns
+                     a boolean
+        name: string name for the new pmf
+        
+    Returns:
+        new Pmf object
+    """
+    xs, ps = pmf.to_arrays()
+    removed = np.array([bool(filter_func(x)) for x in xs], dtype=bool)
+    return condition_on(pmf, ~removed, name)
+
+
+def condition_on(pmf, keep, name='conditional'):
+    """Computes a conditional PMF from a mask over the values.
+
+    Unlike condition_pmf, the condition says which values to keep.
+
+    Args:
+        pmf: Pmf object
+        keep: boolean array parallel to the sorted values of the Pmf,
+              or a vectorized predicate that takes the array of sorted
+              values and returns such a mask
+        name: string name for the new pmf
+
+    Returns:
+        new normalized Pmf object of the same storage kind as pmf
+    """
+    xs, ps = pmf.to_arrays()
+    if callable(keep):
+        keep = keep(xs)
+    keep = np.asarray(keep, dtype=bool)
+    if keep.shape != xs.shape:
+        raise ValueError('mask must have one entry per value.')
+
+    cond_pmf = _pmf_like(pmf, xs[keep], ps[keep], name)
+    cond_pmf.normalize()
+    return cond_pmf
+
+
+def _threshold_indices(xs, thresholds, side):
+    """Finds where each threshold splits the sorted values.
+
+    Values xs[i:] are above the threshold (x > t); xs[:i] are below
+    (x <= t).
+    """
+    if side not in ('above', 'below'):
+        raise ValueError('side must be above or below.')
+    return np.searchsorted(xs, thresholds, side='right')
+
+
+def conditional_pmfs(pmf, thresholds, side='above', name='conditional',
+                     normalize=True):
+    """Computes the distributions of X given X > t, or X <= t, for
+    each threshold t.
+
+    The normalizing constants come from the prefix-sum index of the
+    Pmf, and the values of every result are a read-only view of one
+    shared sorted values array.  With normalize=False the
+    probabilities are read-only views too, so each result costs O(1)
+    and its total is P(X > t) or P(X <= t); copy a result before
+    modifying it.  With normalize=True each result gets its own
+    normalized probabilities, which costs the length of its slice.
+
+    Args:
+        pmf: Pmf object
+        thresholds: sequence of thresholds
+        side: 'above' for X > t, 'below' for X <= t
+        name: string name for the new Pmfs
+        normalize: whether to scale each result to total 1
+
+    Returns:
+        list of ArrayPmf objects, one per threshold; None where the
+        condition has probability 0
+    """
+    xs, ps = pmf.to_arrays()
+    xs = xs.view()
+    xs.setflags(write=False)
+    ps = ps.astype(float)
+    ps.setflags(write=False)
+    cs = pmf.cumulative()[1]
+    indices = _threshold_indices(xs, thresholds, side)
+    pmfs = []
+    for i in np.atleast_1d(indices):
+        if side == 'above':
+            sl, total = slice(i, None), cs[-1] - cs[i]
+        else:
+            sl, total = slice(None, i), cs[i]
+        if total == 0:
+            pmfs.append(None)
+        elif normalize:
+            pmfs.append(ArrayPmf._wrap(xs[sl], ps[sl] / float(total), name))
+        else:
+            pmfs.append(ArrayPmf._wrap(xs[sl], ps[sl], name))
+    return pmfs
+
+
+def conditional_means(pmf, thresholds, side='above'):
+    """Computes E[X | X > t], or E[X | X <= t], for each threshold t.
+
+    Uses cumulative sums of p and x*p, so the cost is one pass over
+    the Pmf plus a binary search per threshold.
+
+    Args:
+        pmf: Pmf object with numeric values
+        thresholds: sequence of thresholds
+        side: 'above' for X > t, 'below' for X <= t
+
+    Returns:
+        numpy array of means; nan where the condition has probability 0
+    """
+    xs, ps = pmf.to_arrays()
+    cs = pmf.cumulative()[1]
+    ms = np.concatenate(([0.0], np.cumsum(xs * ps)))
+    i = _threshold_indices(xs, thresholds, side)
+    if side == 'above':
+        totals, moments = cs[-1] - cs[i], ms[-1] - ms[i]
+    else:
+        totals, moments = cs[i], ms[i]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(totals > 0, moments / np.asarray(totals, float), np.nan)
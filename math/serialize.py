@@ -0,0 +1,106 @@
+"""Binary files of named numpy arrays, for saving distributions.
+
+Layout of a file:
+
+    8 bytes    magic string 'PYSCIDST'
+    4 bytes    little-endian uint32 length of the header
+    header     JSON object with the kind and name of the saved object
+               and, for each array, its key, dtype, shape and offset
+    arrays     raw array data, each starting at a 64-byte boundary
+
+Because the arrays are stored raw at known offsets, they can be
+memory-mapped, so many processes that load the same file share one
+copy of the data in the page cache.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+MAGIC = 'PYSCIDST'
+ALIGN = 64
+
+
+def _aligned(n):
+    """Rounds n up to a multiple of ALIGN."""
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_arrays(path, kind, name, arrays):
+    """Writes a kind, a name and a sequence of arrays to a file.
+
+    Args:
+        path: string filename
+        kind: string type tag, e.g. 'Pmf'
+        name: string name of the saved object
+        arrays: sequence of (key, array) pairs
+
+    Raises:
+        ValueError if an array holds Python objects
+    """
+    arrays = [(key, np.ascontiguousarray(a)) for key, a in arrays]
+    for key, a in arrays:
+        if a.dtype.hasobject:
+            raise ValueError('cannot save %s: values must not be Python '
+                             'objects.' % key)
+
+    # the offsets depend on the header length, which depends on the
+    # offsets; reserve room for them and settle on a fixed point
+    header_len = 0
+    while True:
+        offset = _aligned(len(MAGIC) + 4 + header_len)
+        specs = []
+        for key, a in arrays:
+            specs.append(dict(key=key, dtype=a.dtype.str,
+                              shape=list(a.shape), offset=offset))
+            offset = _aligned(offset + a.nbytes)
+        header = json.dumps(dict(kind=kind, name=name, arrays=specs))
+        if len(header) == header_len:
+            break
+        header_len = len(header)
+
+    with open(path, 'wb') as fp:
+        fp.write(MAGIC)
+        fp.write(struct.pack('<I', len(header)))
+        fp.write(header)
+        for spec, (key, a) in zip(specs, arrays):
+            fp.write('\0' * (spec['offset'] - fp.tell()))
+            fp.write(a.tobytes())
+
+
+def read_arrays(path, mmap_mode='r'):
+    """Reads a file written by write_arrays.
+
+    Args:
+        path: string filename
+        mmap_mode: None to read the arrays into memory, or a numpy
+                   memmap mode: 'r' for read-only, 'c' for
+                   copy-on-write, 'r+' to write through to the file
+
+    Returns:
+        tuple of (kind, name, dict that maps keys to arrays)
+    """
+    with open(path, 'rb') as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError('%s is not a saved distribution.' % path)
+        header_len, = struct.unpack('<I', fp.read(4))
+        header = json.loads(fp.read(header_len))
+
+        arrays = {}
+        for spec in header['arrays']:
+            dtype = np.dtype(str(spec['dtype']))
+            shape = tuple(spec['shape'])
+            count = int(np.prod(shape))
+            if mmap_mode is None or count == 0:
+                fp.seek(spec['offset'])
+                a = np.fromfile(fp, dtype=dtype, count=count).reshape(shape)
+            else:
+                a = np.memmap(path, dtype=dtype, mode=mmap_mode,
+                              offset=spec['offset'], shape=shape)
+            arrays[str(spec['key'])] = a
+
+    name = header['name']
+    if isinstance(name, unicode):
+        name = name.encode('utf-8')
+    return str(header['kind']), name, arrays
@@ -0,0 +1,392 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+"""Bounded-memory summaries of streams.
+
+QuantileSketch: approximate CDF of a numeric stream (KLL sketch).
+
+HeavyHitterHist: Hist of the most frequent keys of a stream
+(Space-Saving).
+
+"""
+
+import heapq
+import math
+
+import numpy as np
+import cdf
+import pmf
+
+
+class QuantileSketch(object):
+    """Summarizes a numeric stream for approximate quantile queries.
+
+    This is a KLL sketch: a stack of compactors, where level h holds
+    values that each stand for 2**h values of the stream.  When a level
+    overflows it is sorted and every other value, starting at a random
+    offset, moves up a level.  Memory stays around 3k values however
+    long the stream is, and ranks are off by roughly 2/k of the stream
+    length with high probability.  Sketches of shards of a stream
+    merge into a sketch of the whole stream.
+
+    Queries mirror Cdf and answer from a Cdf of the retained values,
+    which is rebuilt only after the sketch changes.
+
+    Attributes:
+        k: int size of the largest compactor; controls the accuracy
+        n: number of values summarized
+        levels: list of numpy arrays, one per compactor
+        name: string name
+    """
+
+    def __init__(self, k=200, name='', rng=None):
+        """Makes an empty sketch.
+
+        Args:
+            k: int accuracy parameter, at least 8
+            name: string name, used for the exported Cdf
+            rng: numpy RandomState or int seed for the compaction offsets
+        """
+        if k < 8:
+            raise ValueError('k must be at least 8.')
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.name = name
+        self._rng = pmf.random_state(rng)
+        self._cdf = None
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, h):
+        """Returns the number of values level h may hold."""
+        depth = len(self.levels) - 1 - h
+        return max(2, int(math.ceil(self.k * (2.0 / 3) ** depth)))
+
+    def _compress(self):
+        """Compacts overflowing levels until the sketch fits."""
+        while True:
+            full = [h for h, level in enumerate(self.levels)
+                    if len(level) > self._capacity(h)]
+            if not full:
+                return
+            h = full[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            level = np.sort(self.levels[h])
+            odd = len(level) % 2
+            offset = self._rng.randint(2)
+            promoted = level[offset:len(level)-odd:2]
+            self.levels[h] = level[len(level)-odd:]
+            self.levels[h+1] = np.concatenate((self.levels[h+1], promoted))
+
+    def update(self, values):
+        """Adds a number or an array of numbers to the sketch.
+
+        Passing arrays is much faster than passing one value at a time.
+
+        Args:
+            values: number or array of numbers; NaNs are ignored
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._cdf = None
+        self._compress()
+
+    def merge(self, other):
+        """Adds the values summarized by another sketch to this one.
+
+        Args:
+            other: QuantileSketch
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate((self.levels[h], level))
+        self.n += other.n
+        self._cdf = None
+        self._compress()
+
+    def __add__(self, other):
+        sketch = QuantileSketch(self.k, self.name, self._rng)
+        sketch.merge(self)
+        sketch.merge(other)
+        return sketch
+
+    def __iadd__(self, other):
+        self.merge(other)
+        return self
+
+    def size(self):
+        """Returns the number of values retained."""
+        return sum(len(level) for level in self.levels)
+
+    def to_cdf(self, name=None):
+        """Makes a Cdf from the retained values and their weights.
+
+        Args:
+            name: string name for the Cdf; defaults to the sketch name
+
+        Returns:
+            cdf.Cdf, suitable for plot_cdf
+        """
+        if name is None:
+            name = self.name
+        if self.n == 0:
+            raise ValueError('sketch contains no values.')
+        xs = np.concatenate(self.levels)
+        ws = np.concatenate([np.full(len(level), 2.0 ** h)
+                             for h, level in enumerate(self.levels)])
+        xs, inverse = np.unique(xs, return_inverse=True)
+        cs = np.cumsum(np.bincount(inverse, weights=ws))
+        return cdf.Cdf(xs, cs / cs[-1], name)
+
+    def _get_cdf(self):
+        """Returns the Cdf used for queries, rebuilding it if needed."""
+        if self._cdf is None:
+            self._cdf = self.to_cdf()
+        return self._cdf
+
+    def prob(self, x):
+        """Returns the approximate CDF(x).
+
+        Args:
+            x: number
+
+        Returns:
+            float probability
+        """
+        return self._get_cdf().prob(x)
+
+    def value(self, p):
+        """Returns the approximate InverseCDF(p).
+
+        Args:
+            p: number in the range [0, 1]
+
+        Returns:
+            number value
+        """
+        return self._get_cdf().value(p)
+
+    def percentile(self, p):
+        """Returns the approximate value that corresponds to percentile p.
+
+        Args:
+            p: number in the range [0, 100]
+
+        Returns:
+            number value
+        """
+        return self._get_cdf().percentile(p)
+
+
+class HeavyHitterHist(pmf.Hist):
+    """Represents the most frequent values of a stream in bounded memory.
+
+    This is the Space-Saving algorithm: at most capacity values are
+    tracked, and a new value evicts the one with the smallest count and
+    inherits that count as its error.  freq overestimates the true
+    frequency by at most error(x), which never exceeds n / capacity,
+    and every value more frequent than n / capacity is tracked.
+
+    Counts only go up, through incr, add and update; set, mult and
+    subtract would break the bounds, so they raise
+    NotImplementedError.
+
+    Attributes:
+        capacity: int maximum number of tracked values
+        errors: map from tracked values to their maximum overestimate
+        n: total frequency added to the stream
+    """
+
+    __slots__ = ('capacity', 'errors', 'n', '_heap')
+
+    def __init__(self, capacity=1000, name=''):
+        pmf.Hist.__init__(self, None, name)
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1.')
+        self.capacity = capacity
+        self.errors = {}
+        self.n = 0
+        self._heap = []
+
+    def copy(self, name=None):
+        """Returns a copy of this HeavyHitterHist.
+
+        Args:
+            name: string name for the new HeavyHitterHist
+        """
+        if name is None:
+            name = self.name
+        new = HeavyHitterHist(self.capacity, name)
+        new.d = dict(self.d)
+        new.errors = dict(self.errors)
+        new.n = self.n
+        new._rebuild_heap()
+        return new
+
+    def _rebuild_heap(self):
+        """Rebuilds the heap of (count, value) from the counts."""
+        self._heap = [(count, x) for x, count in self.d.iteritems()]
+        heapq.heapify(self._heap)
+
+    def _push(self, x, count):
+        """Records a new count for x in the heap.
+
+        Stale entries stay in the heap and are skipped when popped; the
+        heap is rebuilt when they outnumber the live ones.
+        """
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+        else:
+            heapq.heappush(self._heap, (count, x))
+
+    def _pop_min(self):
+        """Removes the value with the smallest count.
+
+        Returns:
+            its count
+        """
+        while True:
+            count, x = heapq.heappop(self._heap)
+            if self.d.get(x) == count:
+                del self.d[x]
+                del self.errors[x]
+                return count
+
+    def min_count(self):
+        """Returns the smallest tracked count once all counters are in
+        use, else 0; untracked values occur at most this often."""
+        if len(self.d) < self.capacity:
+            return 0
+        while True:
+            count, x = self._heap[0]
+            if self.d.get(x) == count:
+                return count
+            heapq.heappop(self._heap)
+
+    def incr(self, x, term=1):
+        """Counts term more occurrences of x.
+
+        Args:
+            x: hashable value
+            term: positive number of occurrences
+        """
+        if term <= 0:
+            raise ValueError('term must be positive.')
+        self.n += term
+        if x in self.d:
+            self.d[x] += term
+        elif len(self.d) < self.capacity:
+            self.d[x] = term
+            self.errors[x] = 0
+        else:
+            floor = self._pop_min()
+            self.d[x] = floor + term
+            self.errors[x] = floor
+        self._push(x, self.d[x])
+        self.changed()
+
+    def add(self, values):
+        """Counts a sequence of values.
+
+        Each batch is counted exactly first, so the summary is updated
+        once per distinct value rather than once per occurrence.
+
+        Args:
+            values: sequence or numpy array of hashable values
+        """
+        self.update(pmf.hist_from_list(values))
+
+    def update(self, other):
+        """Adds the frequencies of another histogram to this one.
+
+        Args:
+            other: Hist, or HeavyHitterHist from another worker, in
+                   which case the two summaries are merged and the
+                   error bounds add up
+        """
+        if not isinstance(other, HeavyHitterHist):
+            for x, count in other.iteritems():
+                if count:
+                    self.incr(x, count)
+            return
+
+        # a value missing from a full summary may have occurred up to
+        # that summary's min count times
+        floor1 = self.min_count()
+        floor2 = other.min_count()
+        counts = {}
+        errors = {}
+        for x in set(self.d) | set(other.d):
+            counts[x] = self.d.get(x, floor1) + other.d.get(x, floor2)
+            errors[x] = (self.errors.get(x, floor1) +
+                         other.errors.get(x, floor2))
+        top = heapq.nlargest(self.capacity, counts.iteritems(),
+                             key=lambda item: item[1])
+        self.d = dict(top)
+        self.errors = dict((x, errors[x]) for x in self.d)
+        self.n += other.n
+        self._rebuild_heap()
+        self.changed()
+
+    def set(self, x, y=0):
+        """Not supported; counts change only through incr and update."""
+        raise NotImplementedError('HeavyHitterHist counts only go up; '
+                                  'use incr or update.')
+
+    def mult(self, x, factor):
+        """Not supported; counts change only through incr and update."""
+        raise NotImplementedError('HeavyHitterHist counts only go up; '
+                                  'use incr or update.')
+
+    def subtract(self, other):
+        """Not supported; counts change only through incr and update."""
+        raise NotImplementedError('HeavyHitterHist counts only go up; '
+                                  'use incr or update.')
+
+    def remove(self, x):
+        """Stops tracking the value x.
+
+        Args:
+            x: tracked value
+        """
+        pmf.Hist.remove(self, x)
+        del self.errors[x]
+        self._rebuild_heap()
+
+    def error(self, x):
+        """Returns the maximum amount by which freq(x) overestimates."""
+        if x in self.errors:
+            return self.errors[x]
+        return self.min_count()
+
+    def bounds(self, x):
+        """Returns (lower, upper) bounds on the true frequency of x."""
+        if x in self.d:
+            return self.d[x] - self.errors[x], self.d[x]
+        return 0, self.min_count()
+
+    def top(self, k=None):
+        """Returns the k most frequent values with their counts.
+
+        Args:
+            k: int number of values; if omitted, all tracked values
+
+        Returns:
+            list of (value, count, error) tuples, most frequent first
+        """
+        if k is None:
+            k = len(self.d)
+        top = heapq.nlargest(k, self.d.iteritems(), key=lambda item: item[1])
+        return [(x, count, self.errors[x]) for x, count in top]
@@ -0,0 +1,121 @@
+"""This file contains code for use with "Think Stats",
+by Allen B. Downey, available from greenteapress.com
+
+License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
+"""
+
+"""Grid-based Bayesian estimation on top of pmf.LogPmf.
+
+Suite: represents a set of hypotheses and their probabilities.
+
+"""
+
+import numpy as np
+import pmf
+
+
+class Suite(pmf.LogPmf):
+    """Represents a suite of hypotheses and their probabilities.
+
+    The probabilities are kept in log space.  The likelihood is a
+    vectorized function log_likelihood(data, hypos) that broadcasts
+    like a numpy ufunc: update_set calls it with a column of
+    observations and a row of hypotheses and sums the resulting
+    matrix over the observations, so a whole batch costs one call.
+
+    For example, the suite for the bias of a coin:
+
+        def log_like(data, hypos):
+            return np.where(data == 'H', np.log(hypos), np.log(1 - hypos))
+
+        suite = Suite(np.linspace(0, 1, 101), log_likelihood=log_like)
+        suite.update_set(np.array(list('HHTHT')))
+
+    Subclasses may override log_likelihood instead of passing it in.
+    """
+
+    def __init__(self, hypos=None, log_prior=None, log_likelihood=None,
+                 name=''):
+        """Initializes the suite with a normalized prior.
+
+        Args:
+            hypos: sequence of hypotheses
+            log_prior: sequence of log prior probabilities, parallel
+                       to hypos; if omitted, the prior is uniform
+            log_likelihood: vectorized function of (data, hypos);
+                            required unless a subclass overrides
+                            log_likelihood
+            name: string name for this suite
+
+        Raises:
+            ValueError: if there is no likelihood to update with
+        """
+        if log_likelihood is None and _inherits_log_likelihood(type(self)):
+            raise ValueError('pass log_likelihood or override it in '
+                             'a subclass.')
+        pmf.LogPmf.__init__(self, hypos, log_prior, name)
+        if log_likelihood is not None:
+            self.log_likelihood = log_likelihood
+        if len(self.xs):
+            self.normalize()
+
+    def log_likelihood(self, data, hypos):
+        """Computes the log likelihood of the data under the hypotheses.
+
+        Args:
+            data: array of observations
+            hypos: array of hypotheses, broadcastable against data
+
+        Returns:
+            array of log likelihoods with the broadcast shape
+        """
+        raise NotImplementedError
+
+    def update(self, data):
+        """Updates each hypothesis based on one observation.
+
+        Args:
+            data: any representation of the data
+
+        Returns:
+            float log of the normalizing constant
+        """
+        self.mult_log(self.log_likelihood(data, self.xs))
+        return self._normalize_log()
+
+    def update_set(self, dataset, batchsize=None):
+        """Updates each hypothesis based on a batch of observations.
+
+        The likelihood matrix has one row per observation and one
+        column per hypothesis; batchsize bounds how many rows are
+        evaluated at once.
+
+        Args:
+            dataset: sequence of observations
+            batchsize: int number of observations per likelihood call;
+                       if omitted, the whole dataset is evaluated at once
+
+        Returns:
+            float log of the normalizing constant
+        """
+        data = np.asarray(dataset)
+        if batchsize is None:
+            batchsize = max(len(data), 1)
+        hypos = self.xs[np.newaxis, :]
+        for i in xrange(0, len(data), batchsize):
+            batch = data[i:i+batchsize]
+            like = self.log_likelihood(batch[:, np.newaxis], hypos)
+            self.mult_log(np.sum(like, axis=0))
+        return self._normalize_log()
+
+    def _normalize_log(self):
+        """Normalizes and returns the log of the normalizing constant."""
+        log_total = self.log_total()
+        self.normalize()
+        return log_total
+
+
+def _inherits_log_likelihood(cls):
+    """Checks whether cls uses Suite's unimplemented log_likelihood."""
+    method = getattr(cls.log_likelihood, '__func__', None)
+    return method is Suite.log_likelihood.__func__
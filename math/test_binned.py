@@ -0,0 +1,31 @@
+"""Tests for binned.py.
+
+Run from this directory with python -m unittest test_binned.
+"""
+
+import math
+import unittest
+
+import binned
+
+
+class EmptyTest(unittest.TestCase):
+
+    def test_empty(self):
+        h = binned.BinnedHist(binned.linear_edges(0, 10, 10))
+        h.add([20, -5])
+        self.assertEqual(h.total(), 2)
+        self.assertTrue(math.isnan(h.mean()))
+        self.assertEqual(len(h.to_cdf().xs), 0)
+        self.assertEqual(len(h.to_pmf()), 0)
+
+    def test_to_cdf(self):
+        h = binned.BinnedHist(binned.linear_edges(0, 10, 10))
+        h.add([1.5, 2.5, 2.5])
+        c = h.to_cdf()
+        self.assertEqual(list(c.xs), [2, 3])
+        self.assertAlmostEqual(c.ps[0], 1 / 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Tests for cdf.py.
+
+Run from this directory with python -m unittest test_cdf.
+"""
+
+import unittest
+
+import numpy as np
+
+import cdf
+
+
+class CompressTest(unittest.TestCase):
+
+    def test_ends_of_runs(self):
+        keep = cdf._ends_of_runs(np.array([0, 0, 1, 1, 2, 2]))
+        self.assertEqual(list(keep), [True] * 6)
+        keep = cdf._ends_of_runs(np.array([0, 0, 0, 1, 1, 1]))
+        self.assertEqual(list(keep), [True, False, True, True, False, True])
+        self.assertEqual(len(cdf._ends_of_runs(np.array([]))), 0)
+
+    def test_keeps_maximum(self):
+        c = cdf.Cdf([1, 2, 3, 4, 5], [.2, .4, 1, 1, 1])
+        small = c.compress(10)
+        self.assertEqual(small.xs[-1], 5)
+        self.assertEqual(small.value(1.0), 5)
+        self.assertEqual(small.value(0.0), 1)
+
+
+class RenderTest(unittest.TestCase):
+
+    def test_integer_values(self):
+        # the column scale must not be integer division
+        c = cdf.cdf_from_list(np.arange(100000))
+        xs, ps = c.render(resolution=800)
+        self.assertTrue(800 <= len(xs) // 2 <= 1600)
+        self.assertEqual(xs[0], 0)
+        self.assertEqual(xs[-1], 99999)
+        self.assertEqual(ps[-1], 1.0)
+
+    def test_without_resolution(self):
+        c = cdf.cdf_from_list([1, 2, 2, 3])
+        xs, ps = c.render()
+        self.assertEqual(list(xs), [1, 1, 2, 2, 3, 3])
+        self.assertEqual(list(ps), [0, 0.25, 0.25, 0.75, 0.75, 1.0])
+
+
+class WeightedTest(unittest.TestCase):
+
+    def test_zero_weights(self):
+        c = cdf.cdf_from_weighted([1, 2], [0, 0])
+        self.assertEqual(len(c.xs), 0)
+        self.assertRaises(ValueError, cdf.weighted_percentile,
+                          [1, 2], [0, 0], 50)
+        c = cdf.cdf_from_weighted([1, 2], [1, 3])
+        self.assertEqual(list(c.ps), [0.25, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
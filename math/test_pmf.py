@@ -0,0 +1,176 @@
+"""Tests for pmf.py.
+
+Run from this directory with python -m unittest test_pmf.
+"""
+
+import unittest
+
+import numpy as np
+
+import pmf
+
+
+class CountingTest(unittest.TestCase):
+
+    def test_wide_span(self):
+        # the span overflows int64, so the values must not be binned
+        t = np.array([-2**62, 2**62])
+        self.assertEqual(sorted(pmf.hist_from_list(t).items()),
+                         [(-2**62, 1), (2**62, 1)])
+
+    def test_int8(self):
+        t = np.array([-128, 127, 127, 0], dtype=np.int8)
+        self.assertEqual(sorted(pmf.hist_from_list(t).items()),
+                         [(-128, 1), (0, 1), (127, 2)])
+
+    def test_uint8(self):
+        t = np.array([250, 251, 251], dtype=np.uint8)
+        self.assertEqual(sorted(pmf.hist_from_list(t).items()),
+                         [(250, 1), (251, 2)])
+
+    def test_uint64(self):
+        t = np.array([2**64-1, 2**64-2, 2**64-1], dtype=np.uint64)
+        self.assertEqual(sorted(pmf.hist_from_list(t).items()),
+                         [(2**64-2, 1), (2**64-1, 2)])
+        t = np.array([2**63+1, 2**63+3], dtype=np.uint64)
+        self.assertEqual(sorted(pmf.pmf_from_list(t).items()),
+                         [(2**63+1, 0.5), (2**63+3, 0.5)])
+
+    def test_matches_dict_counting(self):
+        t = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5]
+        h = pmf.hist_from_list(t)
+        expected = {}
+        for x in t:
+            expected[x] = expected.get(x, 0) + 1
+        self.assertEqual(h.get_dict(), expected)
+
+
+class ArithmeticTest(unittest.TestCase):
+
+    def test_narrow_integers_widen(self):
+        p = pmf.ArrayPmf(np.array([250, 251], dtype=np.uint8), [.5, .5])
+        self.assertEqual(list((p + p).xs), [500, 501, 502])
+        self.assertEqual(list((p - p).xs), [-1, 0, 1])
+
+    def test_sum_of_iid_keeps_tails(self):
+        d6 = pmf.ArrayPmf(np.arange(1, 7), np.ones(6) / 6)
+        total = pmf.sum_of_iid(d6, 100)
+        self.assertEqual(len(total.xs), 501)
+        exact = pmf.sum_of_iid(d6, 100, exact=True)
+        self.assertAlmostEqual(exact.prob(100) / 6.0**-100, 1.0)
+
+
+class KeepSortedTest(unittest.TestCase):
+
+    def test_weights_follow_values(self):
+        words = ['pear', 'apple', 'zeta', 'kiwi', 'fig', 'banana']
+        p = pmf.Pmf(keep_sorted=True)
+        h = pmf.Hist(keep_sorted=True)
+        for word in words:
+            p.set(word, len(word))
+            h.incr(word, len(word))
+        self.assertEqual(p.values(), sorted(words))
+        for x, y in zip(p.values(), p.probs()):
+            self.assertEqual(y, len(x))
+        for x, y in zip(h.values(), h.freqs()):
+            self.assertEqual(y, len(x))
+
+
+class ArrayWrapperTest(unittest.TestCase):
+
+    def test_set_widens_values(self):
+        p = pmf.ArrayPmf([1, 2, 3], [.2, .3, .5])
+        p.set(2.5, .1)
+        self.assertEqual(list(p.xs), [1, 2, 2.5, 3])
+        h = pmf.ArrayHist(['a', 'bb'])
+        h.incr('cccc')
+        self.assertEqual(list(h.xs), ['a', 'bb', 'cccc'])
+        h = pmf.ArrayHist(np.array([1, 2], dtype=np.uint8))
+        h.incr(300)
+        self.assertEqual(list(h.xs), [1, 2, 300])
+
+    def test_incr_empty(self):
+        h = pmf.ArrayHist()
+        h.incr('x')
+        h.incr('a')
+        self.assertEqual(h.items(), [('a', 1), ('x', 1)])
+
+    def test_caller_arrays_unchanged(self):
+        ws = np.array([2., 6.])
+        pmf.ArrayPmf([1, 2], ws).normalize()
+        self.assertEqual(list(ws), [2., 6.])
+        ws = np.array([1, 2])
+        pmf.ArrayHist([1, 2], ws).incr(1, 5)
+        self.assertEqual(list(ws), [1, 2])
+        log_ps = np.zeros(2)
+        pmf.LogPmf([1, 2], log_ps).mult(1, 2)
+        self.assertEqual(list(log_ps), [0, 0])
+
+    def test_packed_views(self):
+        packed = pmf.PackedPmfs.from_pmfs([pmf.Pmf({1: 2, 2: 2})])
+        packed[0].normalize()
+        self.assertEqual(list(packed.ps), [0.5, 0.5])
+
+
+class ExtremesTest(unittest.TestCase):
+
+    def test_min_support(self):
+        # differencing the CDF of the min leaves roundoff above 79
+        p1 = pmf.ArrayPmf(np.arange(100), np.ones(100))
+        p2 = pmf.ArrayPmf(np.arange(80), np.ones(80))
+        low = pmf.min_pmfs(p1, p2)
+        self.assertEqual(list(low.xs), range(80))
+        high = pmf.max_pmfs(p1, p2)
+        self.assertEqual(list(high.xs), range(100))
+        self.assertAlmostEqual(low.total(), 1.0)
+
+    def test_zero_probabilities(self):
+        p1 = pmf.Pmf({5: 1, 10: 0, 20: 1})
+        p2 = pmf.Pmf({1: 1, 30: 0})
+        self.assertEqual(sorted(pmf.max_pmfs(p1, p2).items()),
+                         [(5, 0.5), (20, 0.5)])
+        self.assertEqual(pmf.min_pmfs(p1, p2).items(), [(1, 1.0)])
+
+
+class ConditionalTest(unittest.TestCase):
+
+    def test_threshold_past_the_end(self):
+        p = pmf.Pmf(dict.fromkeys([1, 2, 3, 4], 0.25))
+        pmfs = pmf.conditional_pmfs(p, [1, 2, 4])
+        self.assertEqual(pmfs[1].items(), [(3, 0.5), (4, 0.5)])
+        self.assertIsNone(pmfs[2])
+        means = pmf.conditional_means(p, [1, 2, 4])
+        self.assertEqual(means[1], pmfs[1].mean())
+
+    def test_views(self):
+        p = pmf.ArrayPmf([1, 2, 3], [1., 1., 2.])
+        below = pmf.conditional_pmfs(p, [2], side='below', normalize=False)
+        self.assertEqual(below[0].total(), 2.0)
+        self.assertRaises(ValueError, below[0].normalize)
+        self.assertEqual(list(p.ws), [1., 1., 2.])
+
+
+class LogPmfTest(unittest.TestCase):
+
+    def test_random_uses_cached_sampler(self):
+        p = pmf.LogPmf.from_probs([1, 2], [0.5, 0.5])
+        sampler = p.sampler()
+        self.assertIn(p.random(), [1, 2])
+        self.assertIs(p.sampler(), sampler)
+        p.mult(1, 0)
+        self.assertEqual(p.random(), 2)
+        self.assertRaises(ValueError, pmf.LogPmf().random)
+
+
+class MixtureTest(unittest.TestCase):
+
+    def test_mixture(self):
+        p1 = pmf.Pmf({1: 0.5, 2: 0.5})
+        p2 = pmf.Pmf({2: 0.5, 3: 0.5})
+        mix = pmf.make_mixture(pmf.Pmf({p1: 0.25, p2: 0.75}))
+        self.assertEqual(sorted(mix.items()),
+                         [(1, 0.125), (2, 0.5), (3, 0.375)])
+
+
+if __name__ == '__main__':
+    unittest.main()
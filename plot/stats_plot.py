@@ -5,7 +5,6 @@ Copyright 2010 Allen B. Downey
 License: GNU GPLv3 http://www.gnu.org/licenses/gpl.html
 """
 
-import math
 import matplotlib
 import matplotlib.pyplot as pyplot
 import numpy as np
@@ -148,41 +147,47 @@ def plot_hist(hist, reverse=False, **options):
 def plot_hists(hists, binwidth, color, **options):
     """Plots two histograms as interleaved bar plots.
 
+    The frequencies are passed to pyplot.hist as weights, so the
+    histograms are never expanded into individual samples.
+
     Args:
       hists: list of two Hist or Pmf objects
       options: keyword args passed to pyplot.plot
     """
-    x = []
-    L = len(hists[0])
+    values = []
+    weights = []
     labels = []
     for hist in hists:
-        assert len(hist) == L
-        x.append(hist.to_list())
+        xs, fs = hist.render()
+        values.append(list(xs))
+        weights.append(list(fs))
         labels.append(hist.name)
-    options = { }
     options = underride(options, 
                         label=labels,
                         histtype='barstacked',
                         stacked=True,
                         fill=True)
-    n, bins, patches = plt.hist(x, binwidth, options)
-    plt.legend()
+    n, bins, patches = pyplot.hist(values, binwidth, weights=weights,
+                                   **options)
+    pyplot.legend()
 
 
-def plot_cdf(cdf, complement=False, transform=None, **options):
+def plot_cdf(cdf, complement=False, transform=None, resolution=None,
+             **options):
     """Plots a CDF as a line.
 
     Args:
       cdf: Cdf object
       complement: boolean, whether to plot the complementary CDF
       transform: string, one of 'exponential', 'pareto', 'weibull', 'gumbel'
+      resolution: int number of columns to thin the curve to, e.g. the
+                  width of the plot in pixels; see Cdf.render
       options: keyword args passed to pyplot.plot
 
     Returns:
       dictionary with the scale options that should be passed to
       myplot.Save or myplot.show
     """
-    xs, ps = cdf.render()
     scale = dict(xscale='linear', yscale='linear')
 
     if transform == 'exponential':
@@ -194,22 +199,26 @@ def plot_cdf(cdf, complement=False, transform=None, **options):
         scale['yscale'] = 'log'
         scale['xscale'] = 'log'
 
-    if complement:
-        ps = [1.0-p for p in ps]
-
     if transform == 'weibull':
-        xs.pop()
-        ps.pop()
-        ps = [-math.log(1.0-p) for p in ps]
         scale['xscale'] = 'log'
         scale['yscale'] = 'log'
 
     if transform == 'gumbel':
-        xs.pop(0)
-        ps.pop(0)
-        ps = [-math.log(p) for p in ps]
         scale['yscale'] = 'log'
 
+    xs, ps = cdf.render(resolution, scale['xscale'])
+
+    if complement:
+        ps = 1.0 - ps
+
+    if transform == 'weibull':
+        xs = xs[:-1]
+        ps = -np.log(1.0 - ps[:-1])
+
+    if transform == 'gumbel':
+        xs = xs[1:]
+        ps = -np.log(ps[1:])
+
     line = pyplot.plot(xs, ps, label=cdf.name, **options)
     return scale
 